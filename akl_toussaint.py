@@ -0,0 +1,75 @@
+import numpy as np
+from functools import wraps
+
+from predicates import orientation
+from point_set import PointSet
+
+
+# directions in counterclockwise order, so the extreme points form a convex polygon in counterclockwise order
+DIRECTIONS_4 = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)], dtype=float)
+DIRECTIONS_8 = np.array([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)], dtype=float)
+
+
+def akl_toussaint(points: np.ndarray, octagon: bool = True) -> np.ndarray:
+    """
+    Akl-Toussaint heuristic: find the extreme points of the point set in 8 (or 4) directions and throw away every
+    point that lies strictly inside the polygon formed by them, as these can never be vertices of the convex hull.
+    Returns the indices of the points that are kept, in their original order.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0: return np.arange(0)
+
+    directions = DIRECTIONS_8 if octagon else DIRECTIONS_4
+    polygon = points[np.argmax(points @ directions.T, axis=0)]
+
+    # drop repeated extreme points, a polygon with fewer than 3 distinct vertices has no interior
+    polygon = polygon[np.any(polygon != np.roll(polygon, 1, axis=0), axis=1)]
+    if len(np.unique(polygon, axis=0)) < 3: return np.arange(len(points))
+
+    inside = np.ones(len(points), dtype=bool)
+    for a, b in zip(polygon, np.roll(polygon, -1, axis=0)):
+        inside &= orientation(a[0], a[1], b[0], b[1], points[:, 0], points[:, 1]) > 0
+
+    return np.flatnonzero(~inside)
+
+
+def with_prefilter(algorithm, octagon: bool = True):
+    """
+    Wrap a convex hull algorithm such that the Akl-Toussaint heuristic is applied before running it. Works both for
+    algorithms on lists of tuples and for the *_array algorithms that return (indices, coordinates), and for points
+    in a PointSet. The number of points removed by the last call is stored in the attribute removed of the returned
+    function.
+    """
+    @wraps(algorithm)
+    def prefiltered(points):
+        array = np.asarray(points, dtype=float).reshape(-1, 2)
+        keep = akl_toussaint(array, octagon)
+        prefiltered.removed = len(array) - len(keep)
+
+        if isinstance(points, np.ndarray):
+            indices, hull = algorithm(array[keep])
+            return keep[indices], hull
+        if isinstance(points, PointSet):
+            # the algorithms on tuples return indices for a PointSet, the *_array algorithms (indices, coordinates)
+            result = algorithm(PointSet(array[keep]))
+            return (keep[result[0]], result[1]) if isinstance(result, tuple) else keep[result]
+        return algorithm([points[i] for i in keep])
+
+    prefiltered.removed = 0
+    # a name of its own, so a HullCache keeps the results (and timings) apart from those of algorithm
+    prefiltered.__qualname__ = f"with_prefilter({prefiltered.__qualname__}, octagon={octagon})"
+    return prefiltered
+
+
+def main():
+    from random_convex_hull import random_convex_hull_with_points
+
+    n, m = 20, 49980
+    points = random_convex_hull_with_points(n, m).points
+    for octagon in (False, True):
+        keep = akl_toussaint(points, octagon)
+        print(f"{8 if octagon else 4} directions: removed {len(points) - len(keep)} of {len(points)} points")
+
+
+if __name__ == '__main__':
+    main()
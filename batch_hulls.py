@@ -0,0 +1,142 @@
+import numpy as np
+
+from akl_toussaint import DIRECTIONS_8
+from predicates import orientation
+
+
+def batch_hulls(points: np.ndarray, offsets: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the convex hulls of many independent point sets with one call. The sets are stored one after the
+    other in points, an (n, 2) array, set i starting at row offsets[i] and ending where the next set starts.
+    Instead of looping over the sets, the Akl-Toussaint heuristic is applied to all sets at once, the remaining
+    points of all sets are sorted together and the monotone chain runs on all sets of a similar size at the same
+    time: step s pushes the s-th point of every set, and the pops are done for all sets that need one at once. Sets
+    are bucketed by their size rounded up to a power of two, so a bucket never does more than twice the steps its
+    smallest set needs.
+    Returns the indices into points of the hull vertices, for every set in clockwise order starting with its
+    left-most point, one hull after the other, and the offsets of the hulls in that array.
+    """
+    points = np.asarray(points, dtype=float)
+    offsets = np.asarray(offsets, dtype=np.intp)
+    n, G = len(points), len(offsets)
+    x, y = points[:, 0], points[:, 1]
+
+    # sort by set and then lexicographically (complex numbers are compared lexicographically), and drop duplicate
+    # points within a set
+    set_of = np.repeat(np.arange(G), np.diff(np.append(offsets, n)))
+    order = np.flatnonzero(~_inside_octagons(points, offsets, set_of))
+    order = order[np.argsort(x[order] + 1j * y[order], kind='stable')]
+    order = order[np.argsort(set_of[order], kind='stable')]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (set_of[order[1:]] != set_of[order[:-1]]) | np.any(points[order[1:]] != points[order[:-1]], axis=1)
+    order = order[keep]
+    xs, ys = x[order], y[order]
+
+    k = np.bincount(set_of[order], minlength=G)
+    starts = np.cumsum(k) - k
+
+    # sets with fewer than 3 points are their own hull
+    hull_sizes = np.where(k < 3, k, 0)
+    buckets = []
+    sizes = 1 << np.ceil(np.log2(np.maximum(k, 1))).astype(int)
+    for L in np.unique(sizes[k >= 3]):
+        sets = np.flatnonzero((sizes == L) & (k >= 3))
+        stack, top = _chains(xs, ys, starts[sets], k[sets], L)
+        hull_sizes[sets] = top - 1 # the left-most point is pushed twice
+        buckets.append((sets, stack[np.arange(2 * L) < (top - 1)[:, None]]))
+
+    hull_offsets = np.cumsum(hull_sizes) - hull_sizes
+    hulls = np.empty(hull_sizes.sum(), dtype=np.intp)
+    small = np.flatnonzero(k < 3)
+    buckets.append((small, _ragged_range(starts[small], k[small])))
+    for sets, vertices in buckets:
+        hulls[_ragged_range(hull_offsets[sets], hull_sizes[sets])] = vertices
+
+    return order[hulls], hull_offsets
+
+
+def _inside_octagons(points, offsets, set_of):
+    # akl_toussaint for every set: True for the points strictly inside the polygon of the extreme points of their set
+    n = len(points)
+    nonempty = np.diff(np.append(offsets, n)) > 0
+    if not nonempty.any(): return np.zeros(n, dtype=bool)
+    group = (np.cumsum(nonempty) - 1)[set_of]
+    starts = offsets[nonempty]
+
+    proj = points @ DIRECTIONS_8.T
+    is_max = proj == np.maximum.reduceat(proj, starts)[group]
+    first = np.minimum.reduceat(np.where(is_max, np.arange(n)[:, None], n), starts)
+    a = points[first] # (sets, 8, 2), counterclockwise
+    b = np.roll(a, -1, axis=1)
+
+    # repeated extreme points do not form an edge, a set with a single extreme point has no interior
+    repeated = np.all(a == b, axis=2)
+    ax, ay, bx, by = a[:, :, 0][group], a[:, :, 1][group], b[:, :, 0][group], b[:, :, 1][group]
+    left = orientation(ax, ay, bx, by, points[:, :1], points[:, 1:]) > 0
+    return np.all(left | repeated[group], axis=1) & ~repeated.all(axis=1)[group]
+
+
+def _ragged_range(starts, lengths):
+    # concatenation of the ranges starts[i] .. starts[i] + lengths[i]
+    before = np.cumsum(lengths) - lengths
+    return np.repeat(starts - before, lengths) + np.arange(lengths.sum())
+
+
+def _chains(xs, ys, starts, k, L):
+    """
+    Monotone chain on the sets of one bucket, set j consists of the points starts[j] .. starts[j] + k[j] of the
+    sorted arrays xs, ys, with 3 <= k[j] <= L. The points are visited from left to right and then back, as in
+    monotone_chain. Returns the stacks (one row per set, positions in xs) and their heights.
+    """
+    g = len(starts)
+    stack = np.zeros((g, 2 * L), dtype=np.intp)
+    top = np.zeros(g, dtype=np.intp)
+    bottom = np.full(g, 2) # pop only while the stack holds more than bottom - 1 points
+    rows = np.arange(g)
+
+    for s in range(2 * L - 1):
+        active = s <= 2 * k - 2
+        if not active.any(): break
+        p = starts + np.where(s < k, s, 2 * k - 2 - s)
+
+        # the lower hull starts at the right-most point, the upper hull stays on the stack
+        bottom = np.where(s == k, top + 1, bottom)
+
+        # pop while the last two points and p do not make a right turn
+        i = rows[active & (top >= bottom)]
+        while len(i):
+            a, b, q = stack[i, top[i] - 2], stack[i, top[i] - 1], p[i]
+            turn = orientation(xs[a], ys[a], xs[b], ys[b], xs[q], ys[q])
+            i = i[turn >= 0]
+            top[i] -= 1
+            i = i[top[i] >= bottom[i]]
+
+        stack[rows[active], top[active]] = p[active]
+        top += active
+
+    return stack, top
+
+
+def main():
+    import time
+    from graham_scan import graham_scan_array
+    from random_convex_hull import random_convex_hull_with_points
+
+    rng = np.random.default_rng(0)
+    sets = [random_convex_hull_with_points(k, n - k, rng=rng).points
+            for n, k in zip(rng.integers(3, 50, 10000), rng.integers(3, 10, 10000)) if k <= n]
+    points = np.concatenate(sets)
+    offsets = np.concatenate(([0], np.cumsum([len(s) for s in sets])[:-1]))
+
+    t0 = time.perf_counter()
+    hulls, hull_offsets = batch_hulls(points, offsets)
+    t1 = time.perf_counter()
+    single = [graham_scan_array(s)[0] for s in sets]
+    t2 = time.perf_counter()
+
+    same = all(np.array_equal(h + o, b) for h, o, b in zip(single, offsets, np.split(hulls, hull_offsets[1:])))
+    print(f"{len(sets)} sets: batch {t1 - t0:.3f} s, one by one {t2 - t1:.3f} s, same hulls: {same}")
+
+
+if __name__ == '__main__':
+    main()
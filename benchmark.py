@@ -0,0 +1,120 @@
+import gc
+import csv
+import datetime
+import numpy as np
+from time import perf_counter_ns
+from itertools import groupby
+
+from random_convex_hull import random_hull_points
+from chans_algorithm import chan, chan_array
+from gift_wrapping import gift_wrapping, gift_wrapping_array
+from graham_scan import graham_scan, graham_scan_array
+from quickhull import quickhull, quickhull_array
+from kirkpatrick_seidel import kirkpatrick_seidel, kirkpatrick_seidel_array
+
+
+def to_tuples(points: np.ndarray) -> list[tuple]:
+    # the input conversion done by the harnesses for the algorithms on lists of tuples
+    return [tuple(x) for x in points.tolist()]
+
+
+def calibrate(function, setup, min_time=1_000_000):
+    """
+    Returns the number of calls of function (on inputs made by setup) needed for one sample to take at least
+    min_time nanoseconds, so that short calls are not dominated by the resolution of the clock.
+    """
+    loops = 1
+    while True:
+        if sample(function, setup, loops) * loops >= min_time or loops >= 1 << 20: return loops
+        loops *= 2
+
+
+def sample(function, setup, loops):
+    """
+    Time loops calls of function with the garbage collector disabled and return the time per call in nanoseconds.
+    Every call gets its own input from setup, made before the clock starts.
+    """
+    inputs = [setup() for _ in range(loops)]
+    enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        t0 = perf_counter_ns()
+        for x in inputs:
+            function(x)
+        t1 = perf_counter_ns()
+    finally:
+        if enabled: gc.enable()
+    return (t1 - t0) / loops
+
+
+def measure(function, setup, repeat=15, warmup=2, min_time=1_000_000) -> np.ndarray:
+    """
+    Time function on inputs made by setup: a few warmup samples that are thrown away, followed by repeat samples of
+    a calibrated number of calls each. Returns the time per call of every sample in nanoseconds.
+    """
+    loops = calibrate(function, setup, min_time)
+    for _ in range(warmup):
+        sample(function, setup, loops)
+    return np.array([sample(function, setup, loops) for _ in range(repeat)])
+
+
+def summarize(times: np.ndarray, confidence=0.95) -> dict:
+    """
+    Median, quartiles and minimum of the samples, with a distribution-free confidence interval for the median based on
+    the order statistics (normal approximation of the binomial distribution).
+    """
+    times = np.sort(times)
+    n = len(times)
+    z = {0.9: 1.645, 0.95: 1.96, 0.99: 2.576}[confidence]
+    low = max(int(np.floor(n / 2 - z * np.sqrt(n) / 2)), 0)
+    high = min(int(np.ceil(n / 2 + z * np.sqrt(n) / 2)), n - 1)
+    q1, median, q3 = np.percentile(times, [25, 50, 75])
+    return {'median': median, 'q1': q1, 'q3': q3, 'iqr': q3 - q1, 'min': times[0],
+            'ci_low': times[low], 'ci_high': times[high], 'samples': n}
+
+
+def benchmark_cell(algorithm, points_list, repeat=15):
+    """
+    Benchmark an algorithm on the point sets of one (n, k) cell. For the algorithms on lists of tuples the conversion
+    from the array is timed separately. Returns the summaries of the algorithm time and the conversion time.
+    """
+    times, conversion = [], []
+    for points in points_list:
+        if algorithm.__name__.endswith('_array'):
+            times.append(measure(algorithm, lambda: points, repeat))
+        else:
+            tuples = to_tuples(points)
+            times.append(measure(algorithm, lambda: list(tuples), repeat))
+            conversion.append(measure(to_tuples, lambda: points, repeat))
+    return summarize(np.concatenate(times)), summarize(np.concatenate(conversion)) if conversion else None
+
+
+def main(algorithms=(gift_wrapping, graham_scan, chan, quickhull, kirkpatrick_seidel, graham_scan_array, chan_array,
+                     gift_wrapping_array, quickhull_array, kirkpatrick_seidel_array), seeds=5):
+    """
+    Benchmarks the algorithms on the same (n, k) grid as run_tests and writes one row per (n, k, algorithm) to a csv
+    file. The column dt is the median, so the file can be plotted by make_plots directly.
+    """
+    now = datetime.datetime.now()
+    filename = f'data/benchmark_{now.strftime("%Y-%m-%d_%H:%M:%S")}.csv'
+    columns = ['median', 'q1', 'q3', 'iqr', 'min', 'ci_low', 'ci_high', 'samples']
+
+    with open(filename, 'w') as csvfile:
+        writer = csv.writer(csvfile, delimiter=',')
+        writer.writerow(['n', 'k', 'algorithm', 'dt'] + columns + ['conversion'])
+
+        rng = np.random.default_rng()
+        for n, _ in groupby(np.geomspace(3, 5000, 20, dtype=int)):
+            for k, _ in groupby(np.geomspace(3, n, 20, dtype=int)):
+                points_list = [random_hull_points(k, n-k, rng=rng)[0] for _ in range(seeds)]
+                for algorithm in algorithms:
+                    stats, conversion = benchmark_cell(algorithm, points_list)
+                    print(f"n={n}, k={k}, method={algorithm.__name__}: {stats['median']:.0f} ns "
+                          f"[{stats['ci_low']:.0f}, {stats['ci_high']:.0f}]")
+                    writer.writerow([n, k, algorithm.__name__, stats['median']] + [stats[c] for c in columns]
+                                    + [conversion['median'] if conversion else 0])
+
+
+if __name__ == '__main__':
+    main()
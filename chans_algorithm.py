@@ -1,48 +1,60 @@
 import numpy as np
 import math
-import matplotlib.pyplot as plt
+from itertools import accumulate, groupby
+from time import perf_counter
 
-from show_hull import show_hull, show_hulls
-from random_convex_hull import random_convex_hull_with_points
-from graham_scan import graham_scan
+from graham_scan import graham_scan, lexsort_unique, monotone_chain
+from predicates import left_of, orientation
+from point_set import PointSet
+import instrumentation
 
 np.random.seed(0)
 
-def left_of(a: tuple, b: tuple, c: tuple) -> bool:
-    """
-    Returns 1 if point c is left of the line from a to b, 0 if c is on the line and -1 if right of the line
-    """
-    val =  (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
-    if val == 0: return 0
-    return 1 if val > 0 else -1
-
 def binary_search_hull(hull, point):
     """
-    Finds the vertex of a convex hull such that all other points of the hull lie to the right of the directed line from point to that vertex 
+    Finds the vertex of a convex hull (in clockwise order, point outside of it or on its boundary) such that all
+    other vertices of the hull lie to the right of or on the directed line from point to that vertex, the farthest
+    one if there are several. Returns its position in hull.
     """
-    l, r = 0, len(hull) - 1
-
-    if r == 0: return hull[0]
-    if r == 1: return hull[1] if left_of(point, hull[0], hull[1])==1 else hull[0]
-    if point == hull[-1]: return hull[0] # hmm
-
-    while l <= r: 
-        m = l + (r-l)//2
-
-        if (left_of(point, hull[m], hull[m-1]) == -1 and left_of(point, hull[m], hull[(m+1)%(len(hull))]) == -1) or l == r:
-            return hull[m]
-
-        if left_of(point, hull[(m+1)%len(hull)], hull[m]) == 1 and left_of(point, hull[r], hull[m]) == 1:
-            r = m
-        elif left_of(point, hull[r], hull[m]) == -1:
-            if left_of(point, hull[r], hull[l]) == -1:
-                l = m + 1
-            else:
-                r = m
-        else:
-            l = m + 1
-    
-    return hull[m]
+    k = len(hull)
+
+    def turn(i, j):
+        # 1 if vertex j lies to the left of the line from point to vertex i, 0 if on it, -1 if right of it
+        return left_of(point, hull[i % k], hull[j % k])
+
+    def farther(i, j):
+        return dist(point, hull[j % k]) > dist(point, hull[i % k])
+
+    if k <= 8:
+        # for small hulls a linear scan is faster than the binary search
+        c = 0
+        for j in range(1, k):
+            t = turn(c, j)
+            if t > 0 or (t == 0 and farther(c, j)): c = j
+        return c
+
+    # the vertices first turn counterclockwise and then clockwise as seen from point, binary search for the turning
+    # point on the chain a..b
+    stats = instrumentation.stats
+    a, b, c = 0, k, 0
+    while turn(c, c+1) > 0 or turn(c-1, c) < 0:
+        if stats is not None: stats.search_iterations += 1
+        c = (a + b) // 2
+        turn_c = turn(c, c+1)
+        if turn_c <= 0 and turn(c-1, c) >= 0: break
+
+        a_to_c = turn(a, c)
+        left = (turn_c < 0 or a_to_c < 0) if turn(a, a+1) > 0 else (turn_c < 0 and a_to_c > 0)
+        a, b = (a, c) if left else (c, b)
+        if b - a <= 1:
+            t = turn(a, b)
+            c = b if t > 0 or (t == 0 and farther(a, b)) else a
+            break
+
+    # a collinear neighbour that is further away
+    for step in (1, -1):
+        if turn(c, c+step) == 0 and farther(c, c+step): c += step
+    return c % k
 
 def dist(p1, p2):
     return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
@@ -51,9 +63,16 @@ def dist(p1, p2):
 def chan(points: list[tuple], m=None):
     """
     Find the convex hull of a set of points using the chan's algorithm.
+    A round that fails does not start over: the hull vertices wrapped so far are kept and the next round continues
+    wrapping from the last one, and the subhulls of the next round are found by merging adjacent subhulls
+    (merge_subhulls) instead of running Graham's scan again. As a failed round costs little more than these merges
+    while every wrapping step searches all subhulls, m is cubed instead of squared, and once m reaches a quarter of
+    the remaining vertices these are merged into one subhull, which is the hull, instead of wrapping them.
+    For a PointSet the indices of the hull vertices are returned, see chan_array.
     References: ...
     
     """
+    if isinstance(points, PointSet): return chan_array(points, m)[0]
 
     n = len(points)
 
@@ -64,44 +83,38 @@ def chan(points: list[tuple], m=None):
     m = 3 if not m else m 
     #np.random.shuffle(points)
 
+    stats = instrumentation.stats
+    if stats is not None: t = perf_counter()
+
+    #DEBUG: plot the groups
+    #plt.figure()
+    #for i in range(0, n, m):
+    #    plt.scatter([p[0] for p in points[i:i+m]], [p[1] for p in points[i:i+m]], s = 10)
+    #plt.show()
+
+    # Subdivide points into groups of size m and compute their convex hulls with Graham's scan
+    hulls = [graham_scan(points[i:i+m]) for i in range(0, n, m)]
+    if stats is not None: stats.lap('chan subhulls', t)
+
+    # DEBUG: plot the subhulls
+    #show_hulls([np.array(points[i:i+m]) for i in range(0, n, m)], [np.array(h) for h in hulls])
+
+    point_on_hull = min(points) # start with the left-most point
+    hull, wrapped = [point_on_hull], 0
+    cur_hull = points.index(point_on_hull) // m
     while True:
-        # Subdivide points into groups of size n/m
-        groups = [[] for _ in range(math.ceil(n/m))]
-        for i in range(n):
-            groups[i//m].append(points[i])
-
-        #DEBUG: plot the groups
-        #plt.figure()
-        #for i in range(len(groups)):
-        #    plt.scatter( [groups[i][j][0] for j in range(len(groups[i]))],
-        #                 [groups[i][j][1] for j in range(len(groups[i]))],
-        #                 s = 10
-        #                 )
-        #plt.show()
-
-        # Compute the convex hulls of the groups with Graham's scan
-        hulls = []
-        for i in range(len(groups)):
-            cur_hull = graham_scan(groups[i])
-            hulls.append(cur_hull)
-            
-        # Create look_up table for every point (not really necessary, can also do without I think)
-        look_up = {}
-        for i in range(len(hulls)):
-            for j in range(len(hulls[i])):
-                look_up[hulls[i][j]] = (i,j)
-
-        # DEBUG: plot the subhulls
-        #show_hulls([np.array(groups[i]) for i in range(len(groups))], [np.array(hulls[j]) for j in range(len(hulls))])
-
-        # Compute the total convex hull
-        hull = []
-        point_on_hull = min(points) # add left-most point
-        hull.append(point_on_hull)
+        if stats is not None:
+            stats.chan_rounds += 1
+            stats.chan_m.append(m)
+            t = perf_counter()
+
+        # The vertices found in earlier rounds are vertices of the new subhulls as well, continue from the last one
+        cur_ind = hulls[cur_hull].index(point_on_hull)
 
         while True: # we need to add m-1 more points to the hull
-            cur_hull, cur_ind = look_up[point_on_hull]
-            cur_most_extreme = hulls[cur_hull][(cur_ind+1)%len(hulls[cur_hull])] # for current hull, next candidate is always just the next clockwise point
+            # for current hull, next candidate is always just the next clockwise point
+            next_hull, next_ind = cur_hull, (cur_ind+1)%len(hulls[cur_hull])
+            cur_most_extreme = hulls[cur_hull][next_ind]
 
             # Now for each group, we need the "steepest tangent", i.e., we need to find the vertices of the subhulls such that all
             # other vertices of the subhulls lie on the right side of the directed line from last convex hull point to the new vertex.
@@ -110,48 +123,309 @@ def chan(points: list[tuple], m=None):
                 if i == cur_hull: continue #handled separately
 
                 #binary search for next point on every hull
-                cur_extreme_point = binary_search_hull(hulls[i], point_on_hull) # this sorta works
+                j = binary_search_hull(hulls[i], point_on_hull)
+                cur_extreme_point = hulls[i][j]
 
                 is_right = left_of(point_on_hull, cur_extreme_point, cur_most_extreme)
 
+                # of several points on the line from the current vertex, take the farthest
                 if is_right == -1 or (is_right == 0 and dist(cur_extreme_point, point_on_hull) > dist(cur_most_extreme, point_on_hull)):
-                    #extra check for if we still encounter three colinear points! If that is the case, just repick the most recent point on the hull
-                    if len(hull) >= 2 and left_of(hull[-2], point_on_hull, cur_extreme_point) == 0: 
-                        cur_most_extreme = point_on_hull
-                    else:
-                        cur_most_extreme = cur_extreme_point
-
-                #print(look_up[cur_extreme_point])
-                #extreme_points.append(cur_extreme_point)
+                    cur_most_extreme, next_hull, next_ind = cur_extreme_point, i, j
 
-            # Now scan the extreme points, and pick the one that is most extreme (i.e. most "clockwise").
-            #temp = hulls[cur_hull][(cur_ind+1)%len(hulls[cur_hull])]
-            #for p in extreme_points:
-            #    if left_of(point_on_hull, p, temp) <= 0:
-            #        temp = p
-
-            #point_on_hull = temp
-            point_on_hull = cur_most_extreme
+            point_on_hull, cur_hull, cur_ind = cur_most_extreme, next_hull, next_ind
 
             if point_on_hull == hull[0]: 
                 #print(len(hull))
+                if stats is not None:
+                    stats.lap('chan wrapping', t)
+                    stats.wrapping_steps += len(hull) - wrapped
                 return hull
 
             hull.append(point_on_hull)
 
             if len(hull) >= m:
-                #print(f"Couldn't find hull of size {m}, will now try with {m*m}")
+                #print(f"Couldn't find hull of size {m}, will now try with {m*m*m}")
+                if stats is not None:
+                    t = stats.lap('chan wrapping', t)
+                    stats.wrapping_steps += len(hull) - wrapped
                 break
 
-        #for the new points only select those that were part of a convex hull
-        if m > 3:
-            points = [hulls[i][j] for i in range(len(hulls)) for j in range(len(hulls[i]))]
-            n = len(points)
+        # merge adjacent subhulls into groups of about m vertices, only their vertices can be on the hull (see chan for
+        # the schedule of m). Once m reaches a quarter of the vertices they are all merged, that is the hull.
+        m = m*m*m
+        if 4*m >= sum(len(h) for h in hulls):
+            hull = merge_subhulls(hulls)
+            if stats is not None: stats.lap('chan merge', t)
+            return hull
+        group_of = [start // m for start in accumulate((len(h) for h in hulls[:-1]), initial=0)]
+        groups = groupby(range(len(hulls)), group_of.__getitem__)
+        hulls = [merge_subhulls([hulls[i] for i in group]) for _, group in groups]
+        if stats is not None: stats.lap('chan merge', t)
+
+        cur_hull = group_of[cur_hull]
+        wrapped = len(hull)
+
+
+def merge_subhulls(hulls: list[list[tuple]]) -> list[tuple]:
+    """
+    Computes the convex hull of convex polygons (lists of vertices in clockwise order) without sorting their vertices
+    from scratch. Every polygon consists of two runs of vertices in lexicographic order, the upper hull and the lower
+    hull read backwards (as in streaming_hull.merge_hulls). A stable sort finds and merges these runs, in linear time
+    for two polygons and O(N log f) for f polygons, and a single monotone chain pass gives the hull, in clockwise
+    order starting with the left-most point.
+    """
+    runs = []
+    for hull in hulls:
+        left, right = hull.index(min(hull)), hull.index(max(hull))
+        hull = hull[left:] + hull[:left]
+        right = (right - left) % len(hull)
+        runs += hull[:right+1] + hull[:right:-1]
+    points = [p for p, _ in groupby(sorted(runs))]
+    xy = np.array(points)
+    return [points[i] for i in monotone_chain(xy[:, 0], xy[:, 1], np.arange(len(points)))]
+
+
+def tangent_search(xy: np.ndarray, offsets: np.ndarray, lengths: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of binary_search_hull that searches all subhulls at the same time. Subhull i consists of the
+    vertices xy[offsets[i] : offsets[i] + lengths[i]] in clockwise order, q is one point or one point per subhull,
+    lying outside of it. For every subhull returns the index into xy of the vertex such that all other vertices of
+    that subhull lie to the right of or on the directed line from q to that vertex (the farthest one if two vertices
+    lie on this line).
+    """
+    q = np.broadcast_to(np.asarray(q, dtype=float), (len(offsets), 2))
+    x, y = xy[:, 0], xy[:, 1]
+
+    def vertex(s, i):
+        # coordinates of vertex i of the subhulls s = (offsets, lengths, qx, qy)
+        j = s[0] + i % s[1]
+        return x[j], y[j]
+
+    stats = instrumentation.stats
+    def cross(s, u, v):
+        # 1 where v lies to the left of the line from q to u, 0 where on it and -1 where right of it
+        if stats is not None: stats.orientation_tests += len(s[2])
+        return orientation(s[2], s[3], u[0], u[1], v[0], v[1])
+
+    def farther(s, u, v):
+        return (v[0] - s[2])**2 + (v[1] - s[3])**2 > (u[0] - s[2])**2 + (u[1] - s[3])**2
+
+    def better(s, u, v):
+        # True where vertex v is a better candidate than vertex u
+        c = cross(s, u, v)
+        return (c > 0) | ((c == 0) & farther(s, u, v))
+
+    res = np.zeros(len(offsets), dtype=np.intp)
+
+    # with fewer than three vertices, simply compare the first and the last vertex
+    g = np.flatnonzero(lengths < 3)
+    s = (offsets[g], lengths[g], q[g, 0], q[g, 1])
+    res[g] = np.where(better(s, vertex(s, 0), vertex(s, s[1] - 1)), s[1] - 1, 0)
+
+    # Along a convex hull seen from q, the vertices first turn counterclockwise and then clockwise. Binary search
+    # for the vertex where this changes on the chain a..b, starting with the full chain 0..k (vertex k is vertex 0).
+    g = np.flatnonzero(lengths >= 3)
+    s = (offsets[g], lengths[g], q[g, 0], q[g, 1])
+    a, b = np.zeros_like(g), s[1].copy()
+    c = a.copy()
+    v_c = vertex(s, c)
+    done = (cross(s, v_c, vertex(s, c + 1)) <= 0) & (cross(s, vertex(s, c - 1), v_c) >= 0)
+    iterations = 0
+    while True:
+        res[g[done]] = c[done]
+        if done.all(): break
+        iterations += 1
+        g, a, b = g[~done], a[~done], b[~done]
+        s = tuple(t[~done] for t in s)
+
+        c = (a + b) // 2
+        v_a, v_c = vertex(s, a), vertex(s, c)
+        turn_c = cross(s, v_c, vertex(s, c + 1))
+        found = (turn_c <= 0) & (cross(s, vertex(s, c - 1), v_c) >= 0)
+
+        # continue with the sub chain a..c or c..b that contains the turning point
+        up_a = cross(s, v_a, vertex(s, a + 1)) > 0
+        a_to_c = cross(s, v_a, v_c)
+        left = np.where(up_a, (turn_c < 0) | (a_to_c < 0), (turn_c < 0) & (a_to_c > 0))
+        a, b = np.where(left, a, c), np.where(left, c, b)
+
+        # once the chain is a single edge, the turning point is the better of its two vertices
+        short = ~found & (b - a <= 1)
+        if short.any():
+            c = np.where(short, np.where(better(s, vertex(s, a), vertex(s, b)), b, a), c)
+        done = found | short
+
+    # if the vertex after (or before) the result lies on the same line through q and further away, take that one
+    g = np.flatnonzero(lengths >= 3)
+    s = (offsets[g], lengths[g], q[g, 0], q[g, 1])
+    r = res[g]
+    for step in (1, -1):
+        u, v = vertex(s, r), vertex(s, r + step)
+        move = (cross(s, u, v) == 0) & farther(s, u, v)
+        r = np.where(move, r + step, r)
+    res[g] = r % s[1]
+
+    if stats is not None: stats.search_iterations += iterations
+    return offsets + res
+
+
+def most_clockwise(q: np.ndarray, d: np.ndarray, xy: np.ndarray) -> int:
+    """
+    Returns the index of the point in xy that comes after the hull vertex q in clockwise order, i.e. the point such
+    that all other points lie to the right of or on the directed line from q to it (the farthest one if there are
+    several). d is the direction of the hull edge arriving at q, so no point lies to the left of q -> q + d.
+    """
+    v = xy - q
+    norm = np.hypot(v[:, 0], v[:, 1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        key = (v @ d) / norm # cosine of the angle between d and the candidate edge
+    key[norm == 0] = -np.inf
+    i = np.argmax(key)
+
+    # the cosines are not exact, so continue while some point lies strictly left of the line from q to xy[i]
+    while True:
+        side = orientation(q[0], q[1], xy[i, 0], xy[i, 1], xy[:, 0], xy[:, 1])
+        if instrumentation.stats is not None: instrumentation.stats.orientation_tests += len(xy)
+        left = np.flatnonzero(side > 0)
+        if len(left) == 0: break
+        cross = v[i, 0] * v[left, 1] - v[i, 1] * v[left, 0]
+        i = left[np.argmax(cross)]
+
+    on_line = (side == 0) & (v @ v[i] > 0)
+    return int(np.argmax(np.where(on_line, norm, -1.0)))
+
+
+def subhulls(x: np.ndarray, y: np.ndarray, candidates: np.ndarray, m: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the convex hulls of the groups of m consecutive (lexicographically sorted) candidates.
+    Returns the indices of the hull vertices, one hull after the other, and the number of vertices of every hull.
+    """
+    hulls = [group[monotone_chain(x, y, group)] for group in (candidates[i:i+m] for i in range(0, len(candidates), m))]
+    return np.concatenate(hulls), np.array([len(h) for h in hulls])
+
+
+# points in shared memory as seen by a worker process of chan_array
+_shared_points = None
+
+def _attach_shared_points(name, shape):
+    global _shared_points
+    from multiprocessing import shared_memory
+    memory = shared_memory.SharedMemory(name=name)
+    _shared_points = memory, np.ndarray(shape, dtype=float, buffer=memory.buf)
 
-        m = m*m
+def _shared_subhulls(args):
+    candidates, m = args
+    points = _shared_points[1]
+    return subhulls(points[:, 0], points[:, 1], candidates, m)
+
+
+def chan_array(points: np.ndarray, m=None, processes=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Chan's algorithm on an (n, 2) array of points. Instead of searching the subhulls one by one, every wrapping
+    step runs the binary searches on all subhulls at once (tangent_search) and picks the next hull vertex among
+    the tangent points with a single reduction (most_clockwise).
+    If processes is given, the subhulls are computed by that many worker processes. The points are put in shared
+    memory once, the workers only receive and return arrays of indices.
+    Returns the indices into points of the hull vertices in clockwise order, starting with the left-most point,
+    and their coordinates.
+    """
+    points = np.asarray(points, dtype=float)
+    if processes is None or len(points) == 0:
+        return _chan_rounds(points, m, subhulls)
+
+    # multiprocessing takes a while to import, so only when it is used
+    from multiprocessing import Pool, shared_memory
+    memory = shared_memory.SharedMemory(create=True, size=points.nbytes)
+    try:
+        np.ndarray(points.shape, dtype=float, buffer=memory.buf)[:] = points
+        with Pool(processes, initializer=_attach_shared_points, initargs=(memory.name, points.shape)) as pool:
+            def parallel_subhulls(x, y, candidates, m):
+                # hand out whole groups, a few chunks per process to balance the load
+                chunk = m * math.ceil(len(candidates) / (m * 4 * processes))
+                jobs = [(candidates[i:i+chunk], m) for i in range(0, len(candidates), chunk)]
+                parts = pool.map(_shared_subhulls, jobs)
+                return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+            return _chan_rounds(points, m, parallel_subhulls)
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def _chan_rounds(points: np.ndarray, m, compute_subhulls) -> tuple[np.ndarray, np.ndarray]:
+    # the rounds of chan_array, compute_subhulls(x, y, candidates, m) computes the subhulls of a round
+    if len(points) == 0: return np.empty(0, dtype=np.intp), np.empty((0, 2))
+    x, y = points[:, 0], points[:, 1]
+
+    # candidates for the hull in lexicographic order, without duplicates
+    candidates = lexsort_unique(x, y)
+    if len(candidates) <= 2: return candidates, points[candidates]
+    start = candidates[0] # left-most point
+
+    m = 3 if not m else m
+    stats = instrumentation.stats
+    hull, wrapped = [start], 0
+    point_on_hull, direction = start, np.array([0.0, 1.0])
+    while True:
+        if stats is not None:
+            stats.chan_rounds += 1
+            stats.chan_m.append(m)
+            t = perf_counter()
+
+        # Compute the subhulls of groups of m consecutive candidates and store them one after the other. After the
+        # first round the candidates are the vertices of the previous subhulls in sorted order, so this merges
+        # adjacent subhulls with a monotone chain pass, without sorting.
+        flat, lengths = compute_subhulls(x, y, candidates, m)
+        if stats is not None: t = stats.lap('chan_array subhulls', t)
+        if len(lengths) == 1: # a single group, its subhull is the hull
+            return flat, points[flat]
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        flat_xy = points[flat]
+
+        # position of each point in flat and the subhull it belongs to
+        position = np.full(len(points), -1)
+        position[flat] = np.arange(len(flat))
+        group_of = np.repeat(np.arange(len(lengths)), lengths)
+
+        # the vertices found in earlier rounds are vertices of the new subhulls as well, continue from the last one
+        # in the direction of the edge that arrived there
+        while True:
+            q = points[point_on_hull]
+            extreme = tangent_search(flat_xy, offsets, lengths, q)
+
+            # for the subhull that contains q the next candidate is always the next clockwise vertex
+            f = position[point_on_hull]
+            g = group_of[f]
+            extreme[g] = offsets[g] + (f - offsets[g] + 1) % lengths[g]
+
+            next_point = flat[extreme[most_clockwise(q, direction, flat_xy[extreme])]]
+            if next_point == start: break
+
+            direction = points[next_point] - q
+            point_on_hull = next_point
+            hull.append(point_on_hull)
+            if len(hull) >= m: break
+
+        if stats is not None:
+            stats.lap('chan_array wrapping', t)
+            stats.wrapping_steps += len(hull) - wrapped
+        if next_point == start:
+            return np.array(hull), points[hull]
+
+        # only points on a subhull can be on the hull
+        on_subhull = np.zeros(len(points), dtype=bool)
+        on_subhull[flat] = True
+        candidates = candidates[on_subhull[candidates]]
+
+        # the same schedule as in chan, with a single group the subhull is the hull
+        wrapped = len(hull)
+        m = m*m*m
+        if 4*m >= len(candidates): m = len(candidates)
 
 
 def main():
+    from random_convex_hull import random_convex_hull_with_points
+
     n, m = 26, 10000
     true_hull = random_convex_hull_with_points(n, m)
     all_points = true_hull.points.tolist()
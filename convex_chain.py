@@ -0,0 +1,108 @@
+from predicates import left_of, compare_intersection
+
+
+class Chain:
+    """
+    Node of a persistent treap that stores a convex chain in lexicographic order, None is the empty chain. Nodes are
+    never modified after they are created, so a chain can be shared by several hulls. The upper (side = 1) and lower
+    (side = -1) hulls of dynamic_hull and sliding_window_hull are built from such chains with split and merge.
+    """
+    __slots__ = ('point', 'priority', 'left', 'right', 'first', 'last')
+
+    def __init__(self, point, priority, left=None, right=None):
+        self.point, self.priority, self.left, self.right = point, priority, left, right
+        self.first = left.first if left else point
+        self.last = right.last if right else point
+
+
+def join(a, b):
+    """
+    Chain of all points of a followed by all points of b.
+    """
+    if a is None: return b
+    if b is None: return a
+    if a.priority > b.priority:
+        return Chain(a.point, a.priority, a.left, join(a.right, b))
+    return Chain(b.point, b.priority, join(a, b.left), b.right)
+
+
+def split(chain, point, inclusive):
+    """
+    Splits a chain in the points before and after point, point itself goes to the first part if inclusive.
+    """
+    if chain is None: return None, None
+    if chain.point < point or (inclusive and chain.point == point):
+        left, right = split(chain.right, point, inclusive)
+        return Chain(chain.point, chain.priority, chain.left, left), right
+    left, right = split(chain.left, point, inclusive)
+    return left, Chain(chain.point, chain.priority, right, chain.right)
+
+
+def merge(a, b, side):
+    """
+    Merges two upper (side = 1) or lower (side = -1) chains, where all points of a come before those of b, by
+    finding their bridge (p, q). Both treaps are searched at the same time, as by Overmars and van Leeuwen: the
+    neighbours of the current vertices p and q, relative to the line pq, show in which subtree of a or b the bridge
+    lies, or that (p, q) is the bridge. Only if the vertex after p and the one before q both lie on the outer side,
+    this depends on whether their edges meet before or after the last point of a. Every step goes down one of the
+    treaps, so this takes O(log n) time. Of several vertices on the bridge the outermost ones are taken.
+    """
+    if a is None: return b
+    if b is None: return a
+
+    # p and q with the vertices just before and after their subtrees
+    p, p_before, p_after = a, None, None
+    q, q_before, q_after = b, None, None
+    while True:
+        # side * left_of(p, q, x) is positive if x lies on the outer side of the line pq. If the vertex before p
+        # lies on or outside of it the bridge ends before p, if the vertex after q does it ends after q
+        p_point, q_point = p.point, q.point
+        before, after = p.left.last if p.left else p_before, q.right.first if q.right else q_after
+        to_left = before is not None and side * left_of(p_point, q_point, before) >= 0
+        to_right = after is not None and side * left_of(p_point, q_point, after) >= 0
+        if to_left or to_right:
+            if to_left: p, p_after = p.left, p_point
+            if to_right: q, q_before = q.right, q_point
+            continue
+
+        # otherwise the bridge ends at p unless the vertex after p lies outside, and at q unless the one before q does
+        after, before = p.right.first if p.right else p_after, q.left.last if q.left else q_before
+        inner_p = after is None or side * left_of(p_point, q_point, after) <= 0
+        inner_q = before is None or side * left_of(p_point, q_point, before) <= 0
+        if inner_p and inner_q: break
+        if inner_q or (not inner_p and compare_intersection(p_point, after, before, q_point, a.last) <= 0):
+            p, p_before = p.right, p_point
+        else:
+            q, q_after = q.left, q_point
+
+    return join(split(a, p.point, True)[0], split(b, q.point, False)[1])
+
+
+def chain_points(chain) -> list[tuple]:
+    """
+    Returns the points of a chain in lexicographic order.
+    """
+    points, stack, node = [], [], chain
+    while stack or node:
+        while node:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        points.append(node.point)
+        node = node.right
+    return points
+
+
+def below(point, chain, side) -> bool:
+    """
+    Checks if point lies on the chain or on its inner side, and between its first and last point.
+    """
+    if point < chain.first or point > chain.last: return False
+    node, successor, before, after = chain, None, None, None
+    while node:
+        if node.point <= point:
+            before, after = node.point, node.right.first if node.right else successor
+            node = node.right
+        else:
+            successor, node = node.point, node.left
+    return after is None or side * left_of(before, after, point) <= 0
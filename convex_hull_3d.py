@@ -0,0 +1,187 @@
+import numpy as np
+
+from predicates import EPSILON, orientation_3d
+
+
+def initial_tetrahedron(points: np.ndarray) -> list[int]:
+    """
+    Returns the indices of four points that span a tetrahedron, spread out so that it contains many of the points:
+    the lexicographically smallest point, the point farthest from it, the point farthest from the line through these
+    two and the point farthest from the plane through the three. Raises a ValueError if all points are coplanar.
+    """
+    p = points
+    a = int(np.lexsort(p.T[::-1])[0])
+    b = int(np.argmax(np.sum((p - p[a])**2, axis=1)))
+    c = int(np.argmax(np.sum(np.cross(p - p[a], p[b] - p[a])**2, axis=1)))
+    d = int(np.argmax(np.abs((p - p[a]) @ np.cross(p[b] - p[a], p[c] - p[a]))))
+
+    # the distances are not exact, check with the orientation test
+    if orientation_3d(p[a], p[b], p[c], p[d]) == 0:
+        side = orientation_3d(p[a], p[b], p[c], p)
+        if not side.any(): raise ValueError('the points are coplanar')
+        d = int(np.flatnonzero(side)[0])
+    return [a, b, c, d]
+
+
+def incremental_hull_3d_array(points: np.ndarray, rng=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Randomized incremental 3D convex hull (Clarkson-Shor) on an (n, 3) array of points. Starting with a tetrahedron,
+    the points are added in random order. A conflict graph keeps for every point that is still outside the hull one
+    face that it sees, and for every face the points that are assigned to it:
+        - a point without a conflict lies inside the hull and is skipped,
+        - otherwise the faces it sees are found by walking from its conflict face to neighbouring faces, replaced by
+          a cone of new faces from the point to the horizon, and only the points of the removed faces are checked
+          against the new faces (all at once), the conflicts of all other points stay valid.
+    The expected running time is O(n log n), and points are dropped as soon as they are inside, so most of the work
+    is spent near the final hull. All visibility tests use the exact orientation_3d. The points do not have to be
+    in general position, but then a point on the boundary of the hull that is not a corner (e.g. on a face of a
+    cube) can end up as a vertex, as every face is a triangle.
+    Returns the indices of the hull vertices, sorted, and the faces as an (f, 3) array of point indices, each face in
+    counterclockwise order as seen from outside the hull.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 4: raise ValueError('at least 4 points are needed')
+    rng = np.random.default_rng() if rng is None else rng
+
+    # faces are lists of 3 point indices, neighbors[f][i] is the face across the edge from faces[f][i] to
+    # faces[f][i + 1]. Removed faces are kept but not alive. planes[f] is the plane equation of face f, see _planes.
+    a, b, c, d = initial_tetrahedron(points)
+    if orientation_3d(points[a], points[b], points[c], points[d]) > 0: b, c = c, b
+    faces = [[a, b, c], [a, d, b], [b, d, c], [c, d, a]]
+    neighbors = [[1, 2, 3], [3, 2, 0], [1, 3, 0], [2, 1, 0]]
+    alive = [True] * 4
+    plane = _planes(points[faces])
+    planes = list(zip(*(x.tolist() for x in plane)))
+
+    # conflict graph: the face every point sees (-1 if it sees none) and the points assigned to every face
+    conflict = np.full(len(points), -1)
+    rest = np.setdiff1d(np.arange(len(points)), [a, b, c, d])
+    conflict[rest] = _first_visible(points, plane, np.arange(4), faces, rest)
+    members = _group(conflict, rest, [0, 1, 2, 3])
+
+    for p in rng.permutation(len(points)):
+        f = int(conflict[p])
+        if f < 0: continue
+        q = points[p].tolist()
+
+        # the visible faces, by walking from the conflict face to neighbours that are visible as well
+        visible, stack, seen = {f}, [f], {f}
+        while stack:
+            for g in neighbors[stack.pop()]:
+                if g in seen: continue
+                seen.add(g)
+                if _above(planes[g], q, points, faces[g]):
+                    visible.add(g)
+                    stack.append(g)
+
+        # a new face (u, v, p) for every edge u -> v of a visible face whose neighbour g across it is not visible
+        start_at, end_at, new = {}, {}, []
+        for h in visible:
+            alive[h] = False
+            for i, g in enumerate(neighbors[h]):
+                if g in visible: continue
+                u, v = faces[h][i], faces[h][(i + 1) % 3]
+                k = len(faces)
+                faces.append([u, v, p])
+                neighbors.append([g, -1, -1])
+                alive.append(True)
+                neighbors[g][neighbors[g].index(h)] = k
+                start_at[u], end_at[v] = k, k
+                new.append(k)
+        for k in new:
+            u, v, _ = faces[k]
+            neighbors[k][1], neighbors[k][2] = start_at[v], end_at[u]
+        plane = _planes(points[[faces[k] for k in new]])
+        planes.extend(zip(*(x.tolist() for x in plane)))
+
+        # only the points of the removed faces lose their conflict, they either see one of the new faces or are inside
+        orphans = np.concatenate([members.pop(h) for h in visible if h in members] or [np.arange(0)])
+        orphans = orphans[orphans != p]
+        conflict[p] = -1
+        if len(orphans):
+            conflict[orphans] = _first_visible(points, plane, np.array(new), faces, orphans)
+            members.update(_group(conflict, orphans, new))
+
+    faces = np.array([face for face, a in zip(faces, alive) if a])
+    return np.unique(faces), faces
+
+
+def _planes(tri: np.ndarray) -> tuple:
+    """
+    Plane equations of the faces tri (an (f, 3 corners, 3) array): the normal n = (b - a) x (c - a), so a point p
+    lies above face (a, b, c) if p . n - a . n > 0, the offset a . n, and for the rounding error bound of p . n - a . n
+    the permanent of the normal (n with the absolute values of the products) and |a| . permanent.
+    """
+    a, u, v = tri[:, 0], tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]
+    normal = np.cross(u, v)
+    permanent = np.abs(u[:, [1, 2, 0]] * v[:, [2, 0, 1]]) + np.abs(u[:, [2, 0, 1]] * v[:, [1, 2, 0]])
+    return normal, np.einsum('ij,ij->i', a, normal), permanent, np.einsum('ij,ij->i', np.abs(a), permanent)
+
+
+# p . n - a . n is computed with an error of less than this times |p| . permanent + |a| . permanent, see _planes
+PLANE_ERRBOUND = 16 * EPSILON
+
+
+def _above(plane, q, points, face) -> bool:
+    # whether the point q (a list) lies strictly above a face, with the plane of the face as a tuple
+    (nx, ny, nz), offset, (px, py, pz), bound = plane
+    x, y, z = q
+    height = x * nx + y * ny + z * nz - offset
+    bound = PLANE_ERRBOUND * (abs(x) * px + abs(y) * py + abs(z) * pz + bound)
+    if abs(height) > bound: return height > 0
+    return orientation_3d(*points[face], q) > 0
+
+
+def _first_visible(points, plane, candidates, faces, rest) -> np.ndarray:
+    # for every point of rest, the first face of candidates (with the given planes) that it sees, or -1
+    normal, offset, permanent, bound = plane
+    p = points[rest]
+    height = p @ normal.T - offset
+    bound = PLANE_ERRBOUND * (np.abs(p) @ permanent.T + bound)
+    sees = height > bound
+    i, j = np.nonzero(np.abs(height) <= bound)
+    if len(i):
+        tri = points[[faces[f] for f in candidates[j]]]
+        sees[i, j] = orientation_3d(tri[:, 0], tri[:, 1], tri[:, 2], p[i]) > 0
+    return np.where(sees.any(axis=1), candidates[np.argmax(sees, axis=1)], -1)
+
+
+def _group(conflict, rest, faces) -> dict:
+    # the points of rest by their conflict face, for the given faces
+    rest = rest[conflict[rest] >= 0]
+    rest = rest[np.argsort(conflict[rest], kind='stable')]
+    starts = np.searchsorted(conflict[rest], faces)
+    stops = np.searchsorted(conflict[rest], faces, side='right')
+    return {f: rest[i:j] for f, i, j in zip(faces, starts.tolist(), stops.tolist()) if j > i}
+
+
+def incremental_hull_3d(points: list[tuple]) -> list[tuple]:
+    """
+    Find the vertices of the convex hull of a set of 3D points with the randomized incremental algorithm, see
+    incremental_hull_3d_array.
+    """
+    points = np.array(points, dtype=float)
+    vertices, _ = incremental_hull_3d_array(points)
+    return [tuple(p) for p in points[vertices].tolist()]
+
+
+def main():
+    import time
+    from scipy.spatial import ConvexHull
+    from random_convex_hull import random_convex_hull_3d_with_points
+
+    rng = np.random.default_rng(0)
+    for k, m in [(100, 100_000), (1000, 100_000), (10_000, 10_000)]:
+        points = random_convex_hull_3d_with_points(k, m, rng=rng).points
+        t0 = time.perf_counter()
+        vertices, faces = incremental_hull_3d_array(points, rng=rng)
+        t1 = time.perf_counter()
+        qhull = ConvexHull(points)
+        t2 = time.perf_counter()
+        same = np.array_equal(vertices, np.sort(qhull.vertices))
+        print(f"k={k}, m={m}: {len(faces)} faces, incremental {t1 - t0:.3f} s, Qhull {t2 - t1:.3f} s, "
+              f"same vertices: {same}")
+
+
+if __name__ == '__main__':
+    main()
@@ -34,25 +34,78 @@ def create_hulls(N, n, m, save_folder):
         np.savetxt(f"{save_folder}/{n}_{m}/points_{id}", [tuple(x) for x in hull.points.tolist()])
         np.savetxt(f"{save_folder}/{n}_{m}/hull_{id}", [tuple(x) for x in hull.points[hull.vertices].tolist()])
 
+# A binary dataset is a folder with all coordinates in one file of float64 (x, y) pairs, coordinates.bin, and an
+# index of the test cases, manifest.npy. Every test case stores its points followed by its hull vertices.
+MANIFEST_DTYPE = np.dtype([('id', np.int64), ('n', np.int64), ('m', np.int64), ('seed', np.int64),
+                           ('points_offset', np.int64), ('points_count', np.int64),
+                           ('hull_offset', np.int64), ('hull_count', np.int64)])
+
+def append_to_dataset(folder, cases):
+    # cases is an iterable of (n, m, id, seed, points, hull), seed is -1 if unknown
+    os.makedirs(folder, exist_ok=True)
+    manifest_file, coordinates_file = f"{folder}/manifest.npy", f"{folder}/coordinates.bin"
+    manifest = np.load(manifest_file).tolist() if os.path.exists(manifest_file) else []
+    offset = os.path.getsize(coordinates_file) // 16 if os.path.exists(coordinates_file) else 0
+
+    with open(coordinates_file, 'ab') as file:
+        for n, m, id, seed, points, hull in cases:
+            points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+            hull = np.ascontiguousarray(hull, dtype=np.float64).reshape(-1, 2)
+            file.write(points.tobytes())
+            file.write(hull.tobytes())
+            manifest.append((int(id), n, m, seed, offset, len(points), offset + len(points), len(hull)))
+            offset += len(points) + len(hull)
+
+    np.save(manifest_file, np.array(manifest, dtype=MANIFEST_DTYPE))
+
+def create_dataset(N, n, m, folder):
+    # like create_hulls, but appends to a binary dataset and uses the id as seed, so every test case can be regenerated
+    def cases():
+        for i in range(N):
+            id = random.randint(100_000_000, 999_999_990)
+            hull = random_convex_hull_with_points(n, m, rng=np.random.default_rng(id))
+            yield n, m, id, id, hull.points, hull.points[hull.vertices]
+    append_to_dataset(folder, cases())
+
+def convert_hulls(folder, save_folder):
+    # one-time conversion of a folder of text test cases (see create_hulls) to a binary dataset
+    append_to_dataset(save_folder, ((n, m, id, -1, points, hull) for n, m, id, points, hull in load_hulls(folder)))
+
 def load_hulls(folder, n = None, m = None):
-    hulls = {} # store hulls as lists of pairs (poits, hull_points) by (n,m) key
-
-    # if needed: make it so only directory (n,m) is selected given input n and m.
-    for dir_name in os.listdir(folder):
-        n, m = [int(x) for x in dir_name.split('_')]
-        hulls[(n,m)] = {}
-        for file in os.listdir(f"{folder}/{dir_name}"):
-            id = file[-9:]
-            if id not in hulls[(n,m)]: hulls[(n,m)][id] = {}
-
-            if file[:4] == 'hull':
-                hulls[(n,m)][id]['hull'] = np.loadtxt(f"{folder}/{n}_{m}/hull_{id}", ndmin=2)
-            elif file[:6] == 'points':
-                hulls[(n,m)][id]['points'] = np.loadtxt(f"{folder}/{n}_{m}/points_{id}", ndmin=2) 
-            else:
+    """
+    Lazily iterates over the test cases in a folder as (n, m, id, points, hull), optionally only those with the
+    given n and/or m. For a binary dataset, points and hull are read-only views of the memory-mapped coordinates.
+    """
+    if os.path.exists(f"{folder}/manifest.npy"):
+        return _load_binary_hulls(folder, n, m)
+    return _load_text_hulls(folder, n, m)
+
+def _load_binary_hulls(folder, n, m):
+    manifest = np.load(f"{folder}/manifest.npy")
+    if n is not None: manifest = manifest[manifest['n'] == n]
+    if m is not None: manifest = manifest[manifest['m'] == m]
+    if len(manifest) == 0: return
+    coordinates = np.memmap(f"{folder}/coordinates.bin", dtype=np.float64, mode='r').reshape(-1, 2)
+
+    for case in manifest:
+        points = coordinates[case['points_offset'] : case['points_offset'] + case['points_count']]
+        hull = coordinates[case['hull_offset'] : case['hull_offset'] + case['hull_count']]
+        yield int(case['n']), int(case['m']), str(case['id']), points, hull
+
+def _load_text_hulls(folder, n, m):
+    for dir_name in sorted(os.listdir(folder)):
+        dir_n, dir_m = [int(x) for x in dir_name.split('_')]
+        if (n is not None and dir_n != n) or (m is not None and dir_m != m): continue
+
+        ids = []
+        for file in sorted(os.listdir(f"{folder}/{dir_name}")):
+            if file[:4] != 'hull' and file[:6] != 'points':
                 raise RuntimeError(f"Unexpcted file ({file}) appears in: {folder}/{dir_name}")
-    
-    return hulls
+            if file[-9:] not in ids: ids.append(file[-9:])
+
+        for id in ids:
+            yield (dir_n, dir_m, id, np.loadtxt(f"{folder}/{dir_name}/points_{id}", ndmin=2),
+                   np.loadtxt(f"{folder}/{dir_name}/hull_{id}", ndmin=2))
 
 if __name__ == '__main__':
     '''
@@ -80,3 +133,7 @@ if __name__ == '__main__':
     create_special_hull(points, hull, "./special_hulls")
     #'''
 
+    # convert the text test cases to binary datasets once:
+    #convert_hulls("./hulls", "./hulls_bin")
+    #convert_hulls("./special_hulls", "./special_hulls_bin")
+
@@ -0,0 +1,152 @@
+import random
+import numpy as np
+
+from convex_chain import Chain, merge, chain_points, below
+from point_set import PointSet
+
+
+class _Node:
+    """Node of the treap over all points, storing the upper and lower hull of its subtree."""
+    __slots__ = ('point', 'count', 'priority', 'left', 'right', 'upper', 'lower')
+
+    def __init__(self, point):
+        self.point, self.count, self.priority = point, 1, random.random()
+        self.left = self.right = None
+        self.upper = self.lower = None
+
+
+def _update(node):
+    single = Chain(node.point, random.random())
+    left_upper, left_lower = (node.left.upper, node.left.lower) if node.left else (None, None)
+    right_upper, right_lower = (node.right.upper, node.right.lower) if node.right else (None, None)
+    node.upper = merge(merge(left_upper, single, 1), right_upper, 1)
+    node.lower = merge(merge(left_lower, single, -1), right_lower, -1)
+
+
+def _insert(node, new):
+    if node is None:
+        _update(new)
+        return new
+    if new.point < node.point:
+        node.left = _insert(node.left, new)
+        if node.left.priority > node.priority:
+            top, node.left = node.left, node.left.right
+            _update(node)
+            top.right, node = node, top
+    else:
+        node.right = _insert(node.right, new)
+        if node.right.priority > node.priority:
+            top, node.right = node.right, node.right.left
+            _update(node)
+            top.left, node = node, top
+    _update(node)
+    return node
+
+
+def _join_nodes(a, b):
+    if a is None: return b
+    if b is None: return a
+    if a.priority > b.priority:
+        a.right = _join_nodes(a.right, b)
+        _update(a)
+        return a
+    b.left = _join_nodes(a, b.left)
+    _update(b)
+    return b
+
+
+def _delete(node, point):
+    if point < node.point:
+        node.left = _delete(node.left, point)
+    elif point > node.point:
+        node.right = _delete(node.right, point)
+    else:
+        return _join_nodes(node.left, node.right)
+    _update(node)
+    return node
+
+
+class DynamicHull:
+    """
+    Convex hull of a changing set of points, in the style of Overmars and van Leeuwen: a balanced tree (a treap) over
+    the points in lexicographic order, in which every node stores the upper and lower hull of its subtree. These are
+    found by merging the hulls of the children along their bridge, so an insertion or deletion only recomputes the
+    hulls on one path of the tree. Each merge takes O(log n) time, an update O(log^2 n) in expectation.
+    Points may be inserted more than once, they are then also deleted more than once.
+    """
+
+    def __init__(self, points=()):
+        self._root = None
+        self._size = 0
+        for point in points:
+            self.insert(point)
+
+    def __len__(self):
+        return self._size
+
+    def _find(self, point):
+        node = self._root
+        while node and node.point != point:
+            node = node.left if point < node.point else node.right
+        return node
+
+    def insert(self, point):
+        point = tuple(point)
+        node = self._find(point)
+        if node: node.count += 1
+        else: self._root = _insert(self._root, _Node(point))
+        self._size += 1
+
+    def delete(self, point):
+        point = tuple(point)
+        node = self._find(point)
+        if node is None: raise KeyError(f"Point {point} is not in the hull")
+        if node.count > 1: node.count -= 1
+        else: self._root = _delete(self._root, point)
+        self._size -= 1
+
+    def hull(self) -> list[tuple]:
+        """
+        Returns the vertices of the convex hull in clockwise order, starting with the left-most point.
+        """
+        if self._root is None: return []
+        upper, lower = chain_points(self._root.upper), chain_points(self._root.lower)
+        return upper + lower[-2:0:-1]
+
+    def contains(self, point) -> bool:
+        """
+        Checks if the point lies inside or on the boundary of the convex hull.
+        """
+        if self._root is None: return False
+        point = tuple(point)
+        return below(point, self._root.upper, 1) and below(point, self._root.lower, -1)
+
+
+def dynamic_hull(points: list[tuple]) -> list[tuple]:
+    """
+    Find the convex hull of a set of points by inserting them into a DynamicHull one by one.
+    For a PointSet the indices of the hull vertices are returned (the first one of a repeated point).
+    """
+    if isinstance(points, PointSet):
+        index = {}
+        for i, point in enumerate(points):
+            index.setdefault(point, i)
+        return np.array([index[point] for point in DynamicHull(points).hull()], dtype=np.intp)
+    return DynamicHull(points).hull()
+
+
+def main():
+    from graham_scan import graham_scan
+
+    rng = random.Random(0)
+    points = [(rng.randint(0, 20), rng.randint(0, 20)) for _ in range(200)]
+    hull = DynamicHull(points)
+    for i in range(150):
+        hull.delete(points[i])
+        if set(hull.hull()) != set(graham_scan(points[i+1:])):
+            print(f"Hull differs after deleting {i+1} points")
+    print(f"{len(hull)} points left, hull: {hull.hull()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,22 @@
-from show_hull import show_hull
-from random_convex_hull import random_convex_hull_with_points
+from graham_scan import lexsort_unique
+from chans_algorithm import most_clockwise
+from predicates import left_of, orientation
+from point_set import PointSet
+import instrumentation
 
 import numpy as np
 
 
-def left_of(a: tuple, b: tuple, c: tuple) -> bool:
-    """
-    Check if point c is left of the line from a to b.
-    """
-    val = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
-    if val > 0: return 1
-    if val == 0: return 0
-    if val < 0: return -1
-
 def dist(p1, p2):
     return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
 
 def gift_wrapping(points: list[tuple]) -> list[tuple]:
     """
     Find the convex hull of a set of points using the gift wrapping algorithm
-    (aka Jarvis march).
+    (aka Jarvis march). For a PointSet the indices of the hull vertices are
+    returned, see gift_wrapping_array.
     """
+    if isinstance(points, PointSet): return gift_wrapping_array(points)[0]
     # Find the leftmost point. If there are several leftmost points, pick the
     # one with the lowest y-coordinate.
 
@@ -37,9 +33,49 @@ def gift_wrapping(points: list[tuple]) -> list[tuple]:
         if endpoint == hull[0]:
             break
         
+    if instrumentation.stats is not None: instrumentation.stats.wrapping_steps += len(hull)
     return hull
 
+def gift_wrapping_array(points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Gift wrapping on an (n, 2) array of points. Every wrapping step is one vectorized pass over the remaining
+    candidates (most_clockwise, which also prefers the farthest of several collinear points). After every step the
+    candidates that lie strictly inside the part of the hull wrapped so far are dropped.
+    Returns the indices into points of the hull vertices in clockwise order, starting with the left-most point,
+    and their coordinates.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0: return np.empty(0, dtype=np.intp), np.empty((0, 2))
+
+    candidates = lexsort_unique(points[:, 0], points[:, 1])
+    if len(candidates) <= 2: return candidates, points[candidates]
+    xy = points[candidates]
+
+    start = candidates[0] # left-most point
+    hull = [start]
+    point_on_hull, direction = points[start], np.array([0.0, 1.0])
+    while True:
+        i = most_clockwise(point_on_hull, direction, xy)
+        if candidates[i] == start:
+            break
+        direction = xy[i] - point_on_hull
+        point_on_hull = xy[i]
+        hull.append(candidates[i])
+
+        # Points strictly left of the line from the first to the last hull vertex lie inside the wrapped part of
+        # the hull, so they can never be the next hull vertex.
+        a = points[start]
+        keep = orientation(a[0], a[1], point_on_hull[0], point_on_hull[1], xy[:, 0], xy[:, 1]) <= 0
+        if instrumentation.stats is not None: instrumentation.stats.orientation_tests += len(xy)
+        candidates, xy = candidates[keep], xy[keep]
+
+    if instrumentation.stats is not None: instrumentation.stats.wrapping_steps += len(hull)
+    return np.array(hull), points[hull]
+
 def main():
+    from show_hull import show_hull
+    from random_convex_hull import random_convex_hull_with_points
+
     n, m = 10, 100
     points = random_convex_hull_with_points(n, m).points.tolist()
     hull = gift_wrapping(points)
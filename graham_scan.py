@@ -1,8 +1,10 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from time import perf_counter
+from functools import cmp_to_key
 
-from show_hull import show_hull
-from random_convex_hull import random_convex_hull_with_points
+import instrumentation
+from predicates import ERRBOUND, left_of
+from point_set import PointSet
 
 
 def xyz_to_hex(c):
@@ -39,31 +41,48 @@ def compute_angle(p1, p2): # returns cosine of angle
 def sort_helper(p1, p2):
     if p1 == p2: return (10000,0) # we want the initial point (p1) to be last
     angle = compute_angle(p1, p2)
-    dist = abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
-    return -angle, -dist
+    return -angle, -dist(p1, p2)
+
+
+def dist(p1, p2):
+    return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
 
 
 def right_turn(stack):
     if len(stack) < 3: return True
     p,q,s = stack[-3], stack[-2], stack[-1]
-    cross_z = (p[0] - q[0])*(s[1] - q[1]) - (p[1] - q[1])*(s[0] - q[0])
-    return True if cross_z > 0 else False
+    return left_of(p, q, s) == -1
 
 
 def graham_scan(points):
     '''
         Input:
-            - points [(float, float)] : list of points to calculate the convex hull of.
+            - points [(float, float)] : list of points to calculate the convex hull of, or a PointSet.
 
         Output:
-            - points of the convex hull sorted in clockwise order
+            - points of the convex hull sorted in clockwise order, for a PointSet their indices (see graham_scan_array)
     '''
+    if isinstance(points, PointSet): return graham_scan_array(points)[0]
+    stats = instrumentation.stats
+    if stats is not None: t = perf_counter()
+
     # find lowest point, if several lowest points, pick the most left one
     p_start = min(points, key = lambda p : (p[1], p[0]))
 
     # sort points in order of polar angle with p_start. If several points with the same angle, sort by distance to p_start
     points.sort(key = lambda p : sort_helper(p_start, p))
+
+    # the angles are not exact, so sort again comparing with the orientation predicate. The points are already
+    # (almost) sorted, so this only takes a linear number of comparisons
+    orient = left_of if stats is None else instrumentation.counting(left_of)
+    def compare(p1, p2):
+        if p1 == p2: return 0
+        if p1 == p_start: return 1
+        if p2 == p_start: return -1
+        return orient(p_start, p1, p2) or dist(p_start, p2) - dist(p_start, p1)
+    points.sort(key = cmp_to_key(compare))
     # return p_start, points # debug
+    if stats is not None: t = stats.lap('graham_scan sort', t)
 
     stack = []
     for _, p in enumerate(points):
@@ -71,9 +90,96 @@ def graham_scan(points):
             stack.pop()
         stack.append(p)
 
+    if stats is not None:
+        stats.lap('graham_scan scan', t)
+        stats.stack_pops += len(points) - len(stack) # every point is pushed once
     return stack
 
 
+def lexsort_unique(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Returns the indices that sort the points by x-coordinate and then by y-coordinate,
+    with duplicate points left out.
+    """
+    order = np.lexsort((y, x))
+    xs, ys = x[order], y[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (xs[1:] != xs[:-1]) | (ys[1:] != ys[:-1])
+    return order[keep]
+
+
+def monotone_chain(x: np.ndarray, y: np.ndarray, order: np.ndarray) -> list[int]:
+    """
+    Graham scan over points that are already sorted lexicographically (Andrew's monotone chain).
+    Returns the positions in order of the hull vertices in clockwise order, starting with the
+    left-most point. Collinear points are not part of the hull.
+    """
+    xs, ys = x[order].tolist(), y[order].tolist()
+    n = len(xs)
+    if n < 3: return list(range(n))
+
+    def right_of(ax, ay, bx, by, px, py):
+        # left_of(a, b, p) == -1, with the floating point filter done here as this is the inner loop
+        detleft, detright = (bx - ax) * (py - ay), (by - ay) * (px - ax)
+        det, bound = detleft - detright, ERRBOUND * abs(detleft + detright)
+        if det < -bound: return True
+        return det <= bound and left_of((ax, ay), (bx, by), (px, py)) == -1
+    if instrumentation.stats is not None: right_of = instrumentation.counting(right_of)
+
+    # the stack is allocated once, top is the number of points currently on it
+    stack = [0] * (2 * n)
+    top = 0
+
+    # upper hull from left to right, pop as long as the last two points and p do not make a right turn
+    for i in range(n):
+        px, py = xs[i], ys[i]
+        while top >= 2:
+            a, b = stack[top - 2], stack[top - 1]
+            if right_of(xs[a], ys[a], xs[b], ys[b], px, py): break
+            top -= 1
+        stack[top] = i
+        top += 1
+
+    # lower hull from right to left, the upper hull stays on the stack
+    bottom = top + 1
+    for i in range(n - 2, -1, -1):
+        px, py = xs[i], ys[i]
+        while top >= bottom:
+            a, b = stack[top - 2], stack[top - 1]
+            if right_of(xs[a], ys[a], xs[b], ys[b], px, py): break
+            top -= 1
+        stack[top] = i
+        top += 1
+
+    if instrumentation.stats is not None:
+        instrumentation.stats.stack_pops += 2 * n - 1 - top
+    return stack[:top - 1] # the left-most point is pushed twice
+
+
+def graham_scan_array(points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    '''
+        Input:
+            - points np.ndarray (n, 2) : coordinates of the points to calculate the convex hull of.
+
+        Output:
+            - indices into points of the convex hull vertices in clockwise order, starting with the left-most point
+            - coordinates of these vertices, shape (h, 2)
+    '''
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0: return np.empty(0, dtype=np.intp), np.empty((0, 2))
+
+    stats = instrumentation.stats
+    if stats is not None: t = perf_counter()
+
+    x, y = points[:, 0], points[:, 1]
+    order = lexsort_unique(x, y)
+    if stats is not None: t = stats.lap('graham_scan_array sort', t)
+
+    indices = order[monotone_chain(x, y, order)]
+    if stats is not None: stats.lap('graham_scan_array scan', t)
+    return indices, points[indices]
+
+
 # # test sorting
 # if __name__ == '__main__':
 #     #points = [(np.random.uniform(-10, 10), np.random.uniform(-9, 10)) for _ in range(100)] + [(0, -10)]
@@ -93,6 +199,10 @@ def graham_scan(points):
 #     plt.show()
 
 def main():
+    import matplotlib.pyplot as plt
+    from show_hull import show_hull
+    from random_convex_hull import random_convex_hull_with_points
+
     n, m = 10, 100
     points = random_convex_hull_with_points(n, m).points.tolist()
     hull = graham_scan(points)
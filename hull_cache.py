@@ -0,0 +1,184 @@
+import os
+import hashlib
+import numpy as np
+from functools import wraps
+from collections import OrderedDict
+
+from point_set import PointSet
+
+
+# part of every key, increase it when the results or their keys change, so the files older versions left on disk are
+# not read back
+KEY_VERSION = 1
+
+
+class CacheStats:
+    """
+    Counters of a HullCache:
+        - hits, misses : lookups that were found in memory or on disk, and lookups that were not found at all
+        - disk_hits : the hits that were read from the folder on disk
+        - evictions : entries removed from memory to stay within the limits
+    """
+    __slots__ = ('hits', 'misses', 'disk_hits', 'evictions')
+
+    def __init__(self):
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"CacheStats({', '.join(f'{k}={v}' for k, v in self.as_dict().items())})"
+
+
+def points_key(points, name='') -> str:
+    """
+    Content hash of a point set: blake2b of the contiguous float64 coordinate buffer together with its shape, a
+    name (typically the algorithm) and KEY_VERSION, so equal point sets get the same key however they are stored.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{KEY_VERSION}:{name}:{points.shape}:".encode())
+    digest.update(points.data)
+    return digest.hexdigest()
+
+
+class HullCache:
+    """
+    Cache of the results of the convex hull algorithms, keyed by the content of the point sets (see points_key).
+    Entries are kept in memory in least recently used order and evicted when there are more than max_entries of them
+    or they take more than max_bytes. If folder is given, every result is also written to it as a .npz file, which
+    survives eviction and restarts and is read back on a miss in memory.
+    Results are stored as read-only arrays, so they can be handed out without copying and callers can not change
+    them. Wrap an algorithm with wrap (or call the cache on it) to use the cache:
+
+        cache = HullCache(max_bytes=64 * 2**20)
+        cached_chan = cache(chan)
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=256 * 2**20, folder=None):
+        self.max_entries, self.max_bytes, self.folder = max_entries, max_bytes, folder
+        self.stats = CacheStats()
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        if folder is not None: os.makedirs(folder, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.folder is not None and os.path.exists(self._path(key)))
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.npz")
+
+    def get(self, key):
+        """
+        Returns the tuple of read-only arrays stored under key, or None.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return self._entries[key]
+        if self.folder is not None and os.path.exists(self._path(key)):
+            with np.load(self._path(key)) as data:
+                arrays = tuple(data[f'arr_{i}'] for i in range(len(data.files)))
+            for a in arrays:
+                a.setflags(write=False)
+            self._store(key, arrays)
+            self.stats.hits += 1
+            self.stats.disk_hits += 1
+            return self._entries.get(key, arrays)
+        self.stats.misses += 1
+        return None
+
+    def put(self, key, arrays) -> tuple:
+        """
+        Stores a tuple of arrays under key (and on disk) and returns the read-only copies that are stored.
+        """
+        arrays = tuple(np.array(a) for a in arrays)
+        for a in arrays:
+            a.setflags(write=False)
+        if self.folder is not None:
+            # write to a temporary file first, so a crash never leaves a broken entry
+            temporary = self._path(key) + '.tmp.npz'
+            np.savez(temporary, *arrays)
+            os.replace(temporary, self._path(key))
+        self._store(key, arrays)
+        return arrays
+
+    def _store(self, key, arrays):
+        size = sum(a.nbytes for a in arrays)
+        if size > self.max_bytes: return
+        if key in self._entries: self.nbytes -= sum(a.nbytes for a in self._entries.pop(key))
+        self._entries[key] = arrays
+        self.nbytes += size
+        while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= sum(a.nbytes for a in evicted)
+            self.stats.evictions += 1
+
+    def clear(self):
+        # empties the memory, the files on disk are kept
+        self._entries.clear()
+        self.nbytes = 0
+
+    def wrap(self, algorithm, name=None):
+        """
+        Wrap a convex hull algorithm such that its results are cached. Works both for algorithms on lists of tuples
+        and for the *_array algorithms that return (indices, coordinates), which then get the read-only arrays of
+        the cache, and for points in a PointSet, for which the algorithms on tuples return read-only indices.
+        Algorithms on lists of tuples get a new list of the cached vertices on every call.
+        Results are stored under name, by default the module and qualified name of the algorithm. Lambdas, local
+        functions and other callables without a qualified name of their own would share it, they need a name.
+        """
+        if name is None:
+            qualname = getattr(algorithm, '__qualname__', '<none>')
+            if '<' in qualname:
+                raise ValueError(f"{algorithm!r} has no unique qualified name, pass name= to cache it")
+            name = f"{algorithm.__module__}.{qualname}"
+
+        @wraps(algorithm)
+        def cached(points):
+            # what the algorithm returns: (indices, coordinates), an array of indices or a list of tuples
+            if isinstance(points, np.ndarray) or algorithm.__name__.endswith('_array'): kind = 'array'
+            elif isinstance(points, PointSet): kind = 'indices'
+            else: kind = 'tuples'
+            key = points_key(points, f"{name}:{kind}")
+            result = self.get(key)
+            if result is None:
+                result = algorithm(points)
+                if kind == 'indices': result = (result,)
+                if kind == 'tuples': result = (np.array(result, dtype=float).reshape(-1, 2),)
+                result = self.put(key, result)
+            if kind == 'array': return result
+            if kind == 'indices': return result[0]
+            return [tuple(p) for p in result[0].tolist()]
+        return cached
+
+    __call__ = wrap
+
+
+def main():
+    import time
+    import tempfile
+    from chans_algorithm import chan, chan_array
+    from random_convex_hull import random_hull_points
+
+    point_sets = [random_hull_points(100, 100_000, rng=np.random.default_rng(seed))[0] for seed in range(10)]
+    with tempfile.TemporaryDirectory() as folder:
+        cache = HullCache(max_entries=5, folder=folder)
+        for algorithm in [chan_array, chan]:
+            cached = cache(algorithm)
+            inputs = point_sets if algorithm is chan_array else [[tuple(p) for p in x.tolist()] for x in point_sets]
+            for round in range(3):
+                t0 = time.perf_counter()
+                for points in inputs:
+                    cached(points)
+                t1 = time.perf_counter()
+                print(f"{algorithm.__name__}, round {round + 1}: {(t1 - t0) / len(inputs) * 1000:.1f} ms per call")
+        print(cache.stats, f"{len(cache)} entries in memory, {cache.nbytes} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import numpy as np
+
+from predicates import orientation
+from graham_scan import graham_scan_array
+from chans_algorithm import tangent_search
+
+
+class HullIndex:
+    """
+    A convex hull preprocessed for queries. It is built from the output of any of the algorithms: the hull vertices
+    as an (h, 2) array or a list of tuples, in any order, possibly with collinear or repeated vertices, and
+    optionally the indices of these vertices in the original point set. The vertices are brought in the order used
+    everywhere in this project, clockwise starting with the left-most point and without collinear points, after
+    which every query takes O(log h) time and is answered for a whole batch of points at once:
+        - contains : is a point inside or on the boundary of the hull
+        - extreme : the vertex that lies farthest in a direction
+        - tangents : the two vertices where the tangents from a point outside the hull touch it
+    Queries return positions in vertices, indices maps them to indices in the original point set.
+    """
+
+    def __init__(self, hull, indices=None):
+        hull = np.asarray(hull, dtype=float).reshape(-1, 2)
+        position, self.vertices = graham_scan_array(hull)
+        self.indices = position if indices is None else np.asarray(indices)[position]
+
+        # directions of the edges (edge i goes from vertex i to i + 1) as angles that increase along the hull,
+        # starting at the angle of edge 0
+        v = self.vertices
+        edges = np.roll(v, -1, axis=0) - v
+        angles = -np.arctan2(edges[:, 1], edges[:, 0])
+        self._angles = angles[0] + np.mod(angles - angles[0], 2 * np.pi)
+
+        # angles of the vertices 1..h-1 as seen from vertex 0, increasing (clockwise) as vertex 0 is the left-most
+        d = v[1:] - v[0]
+        self._fan = -np.arctan2(d[:, 1], d[:, 0])
+
+    def __len__(self):
+        return len(self.vertices)
+
+    def contains(self, points) -> np.ndarray:
+        """
+        Returns for every point (an (n, 2) array) whether it lies inside or on the boundary of the hull. The vertices
+        1..h-1 as seen from vertex 0 are sorted clockwise, a binary search (np.searchsorted on their angles) finds the
+        triangle of this fan that the point falls in, after which one orientation test with its outer edge decides.
+        The angles are not exact, so the triangle is corrected with exact orientation tests first.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        v, h = self.vertices, len(self.vertices)
+        if h == 0: return np.zeros(len(points), dtype=bool)
+
+        w = points - v[0]
+        if h == 1: return np.all(w == 0, axis=1)
+        x, y = points[:, 0], points[:, 1]
+
+        def cross(i, j=slice(None)):
+            # 1 where the point lies counterclockwise of (to the left of) the line from vertex 0 to vertex i
+            return orientation(v[0, 0], v[0, 1], v[i, 0], v[i, 1], x[j], y[j])
+
+        if h == 2:
+            # a line segment
+            return (cross(1) == 0) & np.all(np.minimum(v[0], v[1]) <= points, axis=1) \
+                & np.all(points <= np.maximum(v[0], v[1]), axis=1)
+
+        # the last vertex t (1 <= t <= h-2) of the fan with the point clockwise of or on the line from vertex 0 to it
+        t = np.clip(np.searchsorted(self._fan, -np.arctan2(w[:, 1], w[:, 0]), side='right'), 1, h - 2)
+        clockwise = lambda t, i: cross(t, i) <= 0
+        i = np.flatnonzero(~clockwise(t, slice(None)) & (t > 1))
+        while len(i):
+            t[i] -= 1
+            i = i[~clockwise(t[i], i) & (t[i] > 1)]
+        i = np.flatnonzero(t < h - 2)
+        i = i[clockwise(t[i] + 1, i)]
+        while len(i):
+            t[i] += 1
+            i = i[t[i] < h - 2]
+            i = i[clockwise(t[i] + 1, i)]
+
+        # inside the cone of the fan, and to the right of or on the edge from vertex t to t + 1
+        edge = orientation(v[t, 0], v[t, 1], v[t + 1, 0], v[t + 1, 1], x, y)
+        return (cross(1) <= 0) & (cross(h - 1) >= 0) & (edge <= 0)
+
+    def extreme(self, directions) -> np.ndarray:
+        """
+        Returns for every direction (an (n, 2) array) the position of the vertex v that maximizes v @ direction.
+        This is the vertex where the edge directions pass the direction turned clockwise by 90 degrees, found with
+        a binary search (np.searchsorted) on the edge angles. The angles are not exact, so the result is checked
+        against its neighbours with exact dot products. If an edge is perpendicular to the direction, either of its
+        two vertices can be returned.
+        """
+        directions = np.asarray(directions, dtype=float).reshape(-1, 2)
+        v, h = self.vertices, len(self.vertices)
+        if h <= 1: return np.zeros(len(directions), dtype=np.intp)
+
+        start = self._angles[0]
+        angle = start + np.mod(-np.arctan2(-directions[:, 0], directions[:, 1]) - start, 2 * np.pi)
+        i = np.searchsorted(self._angles, angle) % h
+
+        dot = lambda i: np.einsum('ij,ij->i', v[i % h], directions)
+        for step in (1, -1):
+            while True:
+                move = dot(i + step) > dot(i)
+                if not move.any(): break
+                i = np.where(move, (i + step) % h, i)
+        return i
+
+    def tangents(self, points) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns for every point (an (n, 2) array) outside the hull the positions of the two vertices where the
+        tangents from the point touch the hull: the first with all vertices to the right of or on the line from the
+        point to it, the second with all vertices to the left of or on that line (the farthest vertex if several
+        vertices lie on the tangent). Both are found with tangent_search, the second on the mirrored hull. For
+        points inside or on the hull both positions are -1.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        h, n = len(self.vertices), len(points)
+        first, second = np.full(n, -1), np.full(n, -1)
+        outside = np.flatnonzero(~self.contains(points))
+        if h == 0 or len(outside) == 0: return first, second
+
+        offsets, lengths = np.zeros(len(outside), dtype=np.intp), np.full(len(outside), h)
+        first[outside] = tangent_search(self.vertices, offsets, lengths, points[outside])
+
+        # mirrored in the x-axis and reversed, the hull is clockwise again
+        mirror = np.array([1.0, -1.0])
+        mirrored = tangent_search((self.vertices * mirror)[::-1], offsets, lengths, points[outside] * mirror)
+        second[outside] = h - 1 - mirrored
+        return first, second
+
+
+def main():
+    import time
+    from random_convex_hull import random_convex_hull_with_points
+
+    hull = random_convex_hull_with_points(1000, 0).points
+    index = HullIndex(hull)
+    queries = np.random.default_rng(0).uniform(hull.min() - 1, hull.max() + 1, (1_000_000, 2))
+
+    t0 = time.perf_counter()
+    inside = index.contains(queries)
+    t1 = time.perf_counter()
+    index.extreme(queries)
+    t2 = time.perf_counter()
+    index.tangents(queries)
+    t3 = time.perf_counter()
+    print(f"{len(queries)} queries on a hull of {len(index)} vertices ({inside.sum()} inside): "
+          f"contains {t1 - t0:.2f} s, extreme {t2 - t1:.2f} s, tangents {t3 - t2:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
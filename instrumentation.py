@@ -0,0 +1,89 @@
+import sys
+from time import perf_counter
+from functools import wraps
+from contextlib import contextmanager
+
+
+# the statistics that are currently collected, None if instrumentation is off
+stats = None
+
+# the scalar orientation predicates of the algorithms, (module, name)
+PREDICATES = [('chans_algorithm', 'left_of'), ('gift_wrapping', 'left_of'), ('graham_scan', 'right_turn'),
+              ('convex_chain', 'left_of')]
+
+
+class HullStats:
+    """
+    Counters collected while instrumentation is on:
+        - orientation_tests : calls of the scalar orientation predicates (left_of, right_turn, and the filtered test
+          of monotone_chain), and points tested against a line by the vectorized predicates (orientation,
+          cross_sign, farthest_left), so that the tuple and the array algorithms can be compared
+        - stack_pops : points popped from the stack by graham_scan and monotone_chain
+        - search_iterations : iterations of binary_search_hull, of the vectorized tangent_search and of the bridge
+          search of kirkpatrick_seidel
+        - subproblems : parts of the points taken from the work stack of quickhull (an edge with the points outside
+          of it) and of kirkpatrick_seidel (a part of the upper or lower hull)
+        - chan_rounds, chan_m : number of rounds of Chan's algorithm and the value of m in every round
+        - wrapping_steps : hull vertices found by wrapping (Jarvis march and Chan's algorithm)
+        - phase_times : wall time in seconds per phase of the algorithms
+    """
+    __slots__ = ('orientation_tests', 'stack_pops', 'search_iterations', 'subproblems', 'chan_rounds', 'chan_m',
+                 'wrapping_steps', 'phase_times')
+
+    def __init__(self):
+        self.orientation_tests = self.stack_pops = self.search_iterations = self.subproblems = 0
+        self.chan_rounds = self.wrapping_steps = 0
+        self.chan_m = []
+        self.phase_times = {}
+
+    def lap(self, phase, start):
+        # add the time since start to phase and return the current time, to start the next phase
+        now = perf_counter()
+        self.phase_times[phase] = self.phase_times.get(phase, 0) + now - start
+        return now
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"HullStats({', '.join(f'{k}={v}' for k, v in self.as_dict().items())})"
+
+
+def counting(predicate):
+    """
+    Returns predicate, but counting every call as an orientation test. Algorithms use this for predicates they define
+    themselves, only while instrumentation is on: if stats is not None: predicate = counting(predicate).
+    """
+    @wraps(predicate)
+    def counted(*args):
+        stats.orientation_tests += 1
+        return predicate(*args)
+    return counted
+
+
+@contextmanager
+def instrument():
+    """
+    Collect statistics of all algorithms run inside the with block:
+
+        with instrument() as hull_stats:
+            chan(points)
+        print(hull_stats)
+
+    The orientation predicates are only replaced by counting versions inside the block, the other counters are
+    updated once per call or per round, so instrumentation costs next to nothing when it is off.
+    """
+    global stats
+    stats = HullStats()
+    replaced = []
+    for module_name, name in PREDICATES:
+        module = sys.modules.get(module_name)
+        if module is not None:
+            replaced.append((module, name, getattr(module, name)))
+            setattr(module, name, counting(getattr(module, name)))
+    try:
+        yield stats
+    finally:
+        for module, name, predicate in replaced:
+            setattr(module, name, predicate)
+        stats = None
@@ -0,0 +1,154 @@
+import numpy as np
+from time import perf_counter
+
+from graham_scan import lexsort_unique
+from predicates import orientation, cross_sign, farthest_left
+from point_set import PointSet
+import instrumentation
+
+
+def bridge(x: np.ndarray, y: np.ndarray, s: np.ndarray, a: float) -> tuple[int, int]:
+    """
+    Finds the edge of the upper hull of the points s (indices into x, y, all with different x-coordinates) that
+    crosses the vertical line through a, with at least one point on either side. The points are paired up and the
+    median slope of the pairs (found with np.argpartition, in linear time) gives a supporting line of the points. If
+    it touches the points on both sides of a it is the bridge, otherwise one point of at least half of the pairs
+    can not be an end of the bridge and is thrown away.
+    Returns the left and the right end of the bridge.
+    """
+    stats = instrumentation.stats
+    while True:
+        if len(s) == 2: return (s[0], s[1]) if x[s[0]] < x[s[1]] else (s[1], s[0])
+        if stats is not None:
+            stats.search_iterations += 1
+            stats.orientation_tests += len(s) // 2 + len(s) # by cross_sign and farthest_left
+
+        # pair up the points, left point p and right point q
+        half = len(s) // 2
+        p, q = s[:half], s[half:2*half]
+        p, q = np.where(x[p] < x[q], p, q), np.where(x[p] < x[q], q, p)
+        dx, dy = x[q] - x[p], y[q] - y[p]
+
+        # the pair with the median slope, slopes are compared exactly with cross products
+        median = np.argpartition(dy / dx, (half - 1) // 2)[(half - 1) // 2]
+        pm, qm = p[median], q[median]
+        steeper = cross_sign(x[pm], y[pm], x[qm], y[qm], x[p], y[p], x[q], y[q])
+
+        # the highest points in the direction perpendicular to the median slope
+        top = s[farthest_left(x[pm], y[pm], x[qm], y[qm], x[s], y[s])]
+        left, right = top[np.argmin(x[top])], top[np.argmax(x[top])]
+        if x[left] <= a < x[right]: return left, right
+
+        if x[right] <= a:
+            # the bridge is less steep than the median, the left point of a pair at least as steep is never on it
+            s = np.concatenate((q[steeper >= 0], p[steeper < 0], q[steeper < 0], s[2*half:]))
+        else:
+            # the bridge is steeper than the median, the right point of a pair at most as steep is never on it
+            s = np.concatenate((p[steeper <= 0], p[steeper > 0], q[steeper > 0], s[2*half:]))
+
+
+def upper_hull(x: np.ndarray, y: np.ndarray, s: np.ndarray) -> list[int]:
+    """
+    Upper hull of the points s (indices into x, y, all with different x-coordinates) from left to right, without
+    collinear points. Marriage before conquest: the bridge over the median x-coordinate is found first, and then
+    only the points above the lines from the left end of the hull to the bridge, and from the bridge to the right
+    end, are left for the two halves. The halves still to be done are kept on a stack.
+    """
+    k, m = s[np.argmin(x[s])], s[np.argmax(x[s])]
+    if k == m: return [k]
+
+    stats = instrumentation.stats
+
+    def above(i, j, s):
+        # the points strictly above the line from i to j
+        if stats is not None: stats.orientation_tests += len(s)
+        return s[orientation(x[i], y[i], x[j], y[j], x[s], y[s]) > 0]
+
+    hull = [k]
+    stack = [m, (k, m, above(k, m, s))] # vertices (int) and parts (left end, right end, points above)
+    while stack:
+        item = stack.pop()
+        if not isinstance(item, tuple):
+            hull.append(item)
+            continue
+        k, m, s = item
+        if len(s) == 0: continue
+        if stats is not None: stats.subproblems += 1
+
+        # bridge over the median, the lower median so that there always are points right of it
+        s = np.concatenate(([k, m], s))
+        a = np.partition(x[s], (len(s) - 1) // 2)[(len(s) - 1) // 2]
+        i, j = bridge(x, y, s, a)
+
+        stack.append((j, m, above(j, m, s)))
+        if j != m: stack.append(j)
+        if i != k: stack.append(i)
+        stack.append((k, i, above(k, i, s)))
+
+    return hull
+
+
+def kirkpatrick_seidel_array(points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Kirkpatrick-Seidel algorithm on an (n, 2) array of points, O(n log h) time. The upper and lower hull are
+    computed separately (the lower hull as the upper hull of the mirrored points) on the highest, respectively
+    lowest point of every x-coordinate.
+    Returns the indices into points of the hull vertices in clockwise order, starting with the left-most point,
+    and their coordinates.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0: return np.empty(0, dtype=np.intp), np.empty((0, 2))
+    x, y = points[:, 0], points[:, 1]
+
+    stats = instrumentation.stats
+    if stats is not None: t = perf_counter()
+
+    # in lexicographic order the lowest point of an x-coordinate comes first and the highest comes last
+    order = lexsort_unique(x, y)
+    new_x = np.ones(len(order), dtype=bool)
+    new_x[1:] = x[order[1:]] != x[order[:-1]]
+    lowest = order[new_x]
+    highest = order[np.append(new_x[1:], True)]
+
+    if stats is not None: t = stats.lap('kirkpatrick_seidel sort', t)
+
+    upper = upper_hull(x, y, highest)
+    if stats is not None: t = stats.lap('kirkpatrick_seidel upper hull', t)
+    lower = upper_hull(x, -y, lowest)
+    if stats is not None: stats.lap('kirkpatrick_seidel lower hull', t)
+
+    # from the left-most point up to the upper hull, and from its right end down to the lower hull
+    hull = lower[:1] + (upper[1:] if upper[0] == lower[0] else upper)
+    if len(lower) > 1 and upper[-1] != lower[-1]: hull.append(lower[-1])
+    hull = np.array(hull + lower[-2:0:-1])
+    return hull, points[hull]
+
+
+def kirkpatrick_seidel(points: list[tuple]) -> list[tuple]:
+    """
+    Find the convex hull of a set of points using the Kirkpatrick-Seidel algorithm, see kirkpatrick_seidel_array.
+    For a PointSet the indices of the hull vertices are returned.
+    """
+    if isinstance(points, PointSet): return kirkpatrick_seidel_array(points)[0]
+    if len(points) == 0: return []
+    _, hull = kirkpatrick_seidel_array(np.array(points, dtype=float))
+    return [tuple(p) for p in hull.tolist()]
+
+
+def main():
+    import time
+    from chans_algorithm import chan_array
+    from random_convex_hull import random_convex_hull_with_points
+
+    for k in (10, 100, 1000):
+        points = random_convex_hull_with_points(k, 100000 - k).points
+        t0 = time.perf_counter()
+        kirkpatrick_seidel_array(points)
+        t1 = time.perf_counter()
+        chan_array(points)
+        t2 = time.perf_counter()
+        print(f"k={k}: Kirkpatrick-Seidel {t1 - t0:.3f} s, Chan {t2 - t1:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
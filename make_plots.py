@@ -4,18 +4,143 @@ import matplotlib as mpl
 import numpy as np
 
 from itertools import cycle
+from functools import partial
+import hashlib
+import json
+import io
+import os
+import sys
+
+
+# the cells of the timings and the aggregates of the times dt kept for every cell
+CELL = ['n', 'k', 'algorithm']
+AGGREGATES = ['count', 'mean', 'm2', 'min', 'max']
+
+
+def aggregate(rows: pd.DataFrame) -> pd.DataFrame:
+    # count, mean, sum of squared differences from the mean (m2), min and max of dt per cell
+    groups = rows.groupby(CELL)['dt']
+    result = groups.agg(['count', 'mean', 'min', 'max'])
+    result['m2'] = groups.var(ddof=0) * result['count']
+    return result[AGGREGATES].reset_index()
+
+
+def combine(aggregates: pd.DataFrame, by=CELL) -> pd.DataFrame:
+    """
+    Merges the aggregates of all rows with the same values in the columns by into one, as if they were computed over
+    all their timings at once. The means are weighted by the counts and the m2 of the parts are added together with
+    the spread of their means (the parallel variance algorithm of Chan, Golub and LeVeque).
+    """
+    aggregates = aggregates.assign(total=aggregates['count'] * aggregates['mean'])
+    groups = aggregates.groupby(by)
+    result = groups.agg(count=('count', 'sum'), total=('total', 'sum'), min=('min', 'min'), max=('max', 'max'))
+    result['mean'] = result['total'] / result['count']
+    mean = aggregates.join(result['mean'].rename('combined'), on=by)['combined']
+    spread = aggregates['count'] * (aggregates['mean'] - mean)**2
+    result['m2'] = groups['m2'].sum() + spread.groupby([aggregates[c] for c in by]).sum()
+    return result[AGGREGATES].reset_index()
+
+
+def std(data: pd.DataFrame) -> pd.Series:
+    # sample standard deviation, 0 for cells with a single timing (m2 is 0 there)
+    return np.sqrt(data['m2'] / (data['count'] - 1).clip(lower=1))
+
+
+def read_rows(filename: str, offset: int, chunk_bytes=16 * 2**20):
+    """
+    Reads the complete rows of a timing csv file after byte offset (0 for the whole file), chunk_bytes at a time.
+    Yields the rows of every chunk, as a DataFrame with the columns n, k, algorithm and dt, and the offset up to
+    which the file has been read. A row that is still being written is left for the next time.
+    """
+    with open(filename, 'rb') as file:
+        header = file.readline()
+        columns = header.decode().strip().split(',')
+        offset = max(offset, len(header))
+        file.seek(offset)
+        rest = b''
+        while True:
+            block = file.read(chunk_bytes)
+            if not block: break
+            block = rest + block
+            end = block.rfind(b'\n') + 1
+            rest = block[end:]
+            if end == 0: continue
+            rows = pd.read_csv(io.BytesIO(block[:end]), header=None, names=columns, usecols=CELL + ['dt'])
+            offset += end
+            yield rows, offset
+
+
+def update_aggregates(filenames, store='data/aggregates.csv') -> tuple[pd.DataFrame, dict]:
+    """
+    Ingests the timing csv files (of run_tests or benchmark) into the aggregates per cell kept in store, and returns
+    the aggregates over all files that were ever ingested together with the state stored next to them (a .json
+    file with how far every file was read and which plots were made from which data).
+    The aggregates are kept per file, so only the rows that were added to a file since the last time are read. A
+    file that was rewritten (as run_tests does when resuming) is ingested again from the start, which is detected
+    by the bytes just before the offset it was read up to.
+    """
+    if os.path.exists(store): per_file = pd.read_csv(store, float_precision='round_trip')
+    else: per_file = pd.DataFrame(columns=['file'] + CELL + AGGREGATES).astype({'n': int, 'k': int, 'count': int})
+    state = {'files': {}, 'plots': {}}
+    if os.path.exists(os.path.splitext(store)[0] + '.json'):
+        with open(os.path.splitext(store)[0] + '.json') as file:
+            state = json.load(file)
+
+    changed = False
+    for filename in filenames:
+        start, tail = state['files'].get(filename, (0, ''))
+        if start and _tail(filename, start) != tail: start = 0
+        end, parts = start, []
+        for rows, end in read_rows(filename, start):
+            parts.append(aggregate(rows).assign(file=filename))
+
+        # read from the start, the old aggregates of the file are replaced, otherwise the new rows are added to them
+        if parts or start == 0:
+            if start: parts.append(per_file[per_file['file'] == filename])
+            per_file = per_file[per_file['file'] != filename]
+            if parts: parts = [combine(pd.concat(parts), ['file'] + CELL)]
+            per_file = pd.concat([df for df in [per_file] + parts if len(df)] or [per_file], ignore_index=True)
+            changed = True
+        state['files'][filename] = (end, _tail(filename, end))
+
+    # the aggregates have to match the offsets up to which the files were read, so both are replaced right after
+    # each other, and each in one step
+    if changed:
+        per_file.to_csv(store + '.tmp', index=False)
+        os.replace(store + '.tmp', store)
+    write_state(state, store)
+    return combine(per_file).sort_values(CELL, ignore_index=True), state
+
+
+def _tail(filename: str, offset: int) -> str:
+    # the bytes just before offset, to recognize a file that was rewritten
+    with open(filename, 'rb') as file:
+        file.seek(max(offset - 64, 0))
+        return file.read(min(offset, 64)).hex()
+
+
+def write_state(state: dict, store: str):
+    filename = os.path.splitext(store)[0] + '.json'
+    with open(filename + '.tmp', 'w') as file:
+        json.dump(state, file)
+    os.replace(filename + '.tmp', filename)
+
+
+def save(fig, name: str):
+    fig.savefig(f'data/{name}.png')
+    fig.savefig(f'data/{name}.pdf')
+    fig.savefig(f'data/{name}.pgf', backend='pgf')
+    plt.close(fig)
 
 
 def plot_by_n(data: pd.DataFrame):
-    data = data.drop(columns='k')
-    data = data.groupby(['n', 'algorithm']).agg({'dt': ['mean', 'std']})
-    data = data.reset_index()
+    data = combine(data, ['n', 'algorithm'])
 
     fig, ax = plt.subplots()
     for label, df in data.groupby('algorithm'):
-        mean, std = df['dt', 'mean'], df['dt', 'std']
+        mean, std_ = df['mean'], std(df)
         ax.plot(df['n'], mean, label=label)
-        ax.fill_between(df['n'], mean - std, mean + std, alpha=0.2)
+        ax.fill_between(df['n'], mean - std_, mean + std_, alpha=0.2)
     ax.set_xscale('log')
     ax.set_yscale('log')
     ax.set_xlabel('n')
@@ -23,23 +148,17 @@ def plot_by_n(data: pd.DataFrame):
     ax.legend()
     ax.set_title('Time to compute convex hull')
     fig.tight_layout()
-    fig.savefig('data/plot_by_n.png')
-    fig.savefig('data/plot_by_n.pdf')
-    fig.savefig('data/plot_by_n.pgf', backend='pgf')
+    save(fig, 'plot_by_n')
 
 
 def plot_3d(data: pd.DataFrame):
-    data = data.groupby(['n', 'k', 'algorithm']).agg({'dt': ['mean', 'std']})
-    data = data.reset_index()
-
     fig = plt.figure()
     ax = fig.add_subplot(111, projection='3d')
     fakelines, labels = [], []
     colors = cycle(mpl.rcParams['axes.prop_cycle'].by_key()['color'])
     for label, df in data.groupby('algorithm'):
         c = next(colors)
-        mean, std = df['dt', 'mean'], df['dt', 'std']
-        ax.plot_trisurf(np.log10(df['n']), np.log10(df['k']), np.log10(mean), label=label, alpha=0.3)
+        ax.plot_trisurf(np.log10(df['n']), np.log10(df['k']), np.log10(df['mean']), label=label, alpha=0.3)
         fakelines.append(mpl.lines.Line2D([0],[0], linestyle="none", marker = 'o', c=c))
         labels.append(label)
 
@@ -59,21 +178,18 @@ def plot_3d(data: pd.DataFrame):
     ax.set_title('Time to compute convex hull')
     ax.legend(fakelines, labels)
     fig.tight_layout()
-    fig.savefig('data/plot_3d.png')
-    fig.savefig('data/plot_3d.pdf')
-    fig.savefig('data/plot_3d.pgf', backend='pgf')
+    save(fig, 'plot_3d')
 
 def plot_n_projected(data: pd.DataFrame):
-    data = data.groupby(['n', 'k', 'algorithm']).mean().reset_index()
-    data = data.drop(columns='k')
-    data = data.groupby(['n', 'algorithm']).agg(['min', 'max']).reset_index()
+    # the range of the mean times over k
+    data = data.groupby(['n', 'algorithm'])['mean'].agg(['min', 'max']).reset_index()
 
     fig, ax = plt.subplots()
     colors = cycle(mpl.rcParams['axes.prop_cycle'].by_key()['color'])
     for (label, df), c in zip(data.groupby('algorithm'), colors):
-        ax.plot(df['n'], df['dt', 'min'], c=c, label=label)
-        ax.plot(df['n'], df['dt', 'max'], c=c)
-        ax.fill_between(df['n'], df['dt', 'min'], df['dt', 'max'], alpha=0.3, color=c)
+        ax.plot(df['n'], df['min'], c=c, label=label)
+        ax.plot(df['n'], df['max'], c=c)
+        ax.fill_between(df['n'], df['min'], df['max'], alpha=0.3, color=c)
     ax.set_xscale('log')
     ax.set_yscale('log')
     ax.set_xlabel('$n$')
@@ -81,18 +197,15 @@ def plot_n_projected(data: pd.DataFrame):
     ax.set_title('Time to compute convex hull (projected)')
     ax.legend()
     fig.tight_layout()
-    fig.savefig('data/plot_n_projected.png')
-    fig.savefig('data/plot_n_projected.pdf')
-    fig.savefig('data/plot_n_projected.pgf', backend='pgf')
+    save(fig, 'plot_n_projected')
 
 
 def plot_k_is_n(data: pd.DataFrame):
-    data = data.groupby(['n', 'k', 'algorithm']).mean().reset_index()
     data = data[data['n'] == data['k']]
 
     fig, ax = plt.subplots()
     for label, df in data.groupby('algorithm'):
-        ax.plot(df['n'], df['dt'], label=label)
+        ax.plot(df['n'], df['mean'], label=label)
     ax.set_xscale('log')
     ax.set_yscale('log')
     ax.set_xlabel('$k$')
@@ -100,18 +213,15 @@ def plot_k_is_n(data: pd.DataFrame):
     ax.set_title('Time to compute convex hull with $n=k$')
     ax.legend()
     fig.tight_layout()
-    fig.savefig('data/plot_k_is_n.png')
-    fig.savefig('data/plot_k_is_n.pdf')
-    fig.savefig('data/plot_k_is_n.pgf', backend='pgf')
+    save(fig, 'plot_k_is_n')
 
 
 def plot_n_is_5000(data: pd.DataFrame):
-    data = data.groupby(['n', 'k', 'algorithm']).mean().reset_index()
     data = data[data['n'] == 5000]
 
     fig, ax = plt.subplots()
     for label, df in data.groupby('algorithm'):
-        ax.plot(df['k'], df['dt'], label=label)
+        ax.plot(df['k'], df['mean'], label=label)
     ax.set_xscale('log')
     ax.set_yscale('log')
     ax.set_xlabel('$k$')
@@ -119,19 +229,70 @@ def plot_n_is_5000(data: pd.DataFrame):
     ax.set_title('Time to compute convex hull with $n=5000$')
     ax.legend()
     fig.tight_layout()
-    fig.savefig('data/plot_n_is_5000.png')
-    fig.savefig('data/plot_n_is_5000.pdf')
-    fig.savefig('data/plot_n_is_5000.pgf', backend='pgf')
+    save(fig, 'plot_n_is_5000')
+
+
+def plot_ratio(data: pd.DataFrame, numerator: str, denominator: str, name: str):
+    # ratio of the mean times of two algorithms on every (n, k) cell
+    data = data.set_index(CELL)['mean'].unstack('algorithm')
+    data = (data[numerator] / data[denominator]).dropna().reset_index(name='ratio')
+
+    fig, ax = plt.subplots()
+    points = ax.scatter(data['n'], data['k'], c=data['ratio'], norm=mpl.colors.LogNorm(), cmap='coolwarm')
+    fig.colorbar(points, ax=ax, label=f'{numerator} / {denominator}')
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('$n$')
+    ax.set_ylabel('$k$')
+    ax.set_title(f'Time of {numerator} relative to {denominator}')
+    fig.tight_layout()
+    save(fig, f'plot_ratio_{name}')
+
+
+def fingerprint(data: pd.DataFrame) -> str:
+    # hash of the aggregates shown in a plot, to tell whether it has to be made again
+    return hashlib.blake2b(pd.util.hash_pandas_object(data, index=False).values.tobytes(), digest_size=16).hexdigest()
+
+
+def main(*filenames, store='data/aggregates.csv'):
+    """
+    Ingests the timing files into the aggregates in store (see update_aggregates) and plots the aggregates of all
+    timings ingested so far. Works both for the raw timings of run_tests and for the medians written by benchmark.
+    A plot is only made again when the aggregates of the cells it shows have changed, or when it is missing.
+    """
+    data, state = update_aggregates(filenames or ['data/data_2024-01-21_15:42:18.csv'], store)
+    # the 3D algorithms are only compared with each other
+    is_3d = data['algorithm'].isin(['incremental_hull_3d', 'qhull_3d'])
+    data = data.replace({'graham_scan': 'Graham Scan', 'gift_wrapping': 'Jarvis March', 'chan': 'Chan\'s Algorithm',
+                         'graham_scan_array': 'Graham Scan (NumPy)', 'gift_wrapping_array': 'Jarvis March (NumPy)',
+                         'chan_array': 'Chan\'s Algorithm (NumPy)', 'quickhull': 'Quickhull',
+                         'quickhull_array': 'Quickhull (NumPy)', 'kirkpatrick_seidel': 'Kirkpatrick-Seidel',
+                         'kirkpatrick_seidel_array': 'Kirkpatrick-Seidel (NumPy)',
+                         'incremental_hull_3d': 'Randomized Incremental (3D)', 'qhull_3d': 'Qhull (3D)'})
+    data, data_3d = data[~is_3d], data[is_3d]
+
+    # (name, function, the aggregates it shows)
+    plots = [('plot_by_n', plot_by_n, data), ('plot_3d', plot_3d, data), ('plot_n_projected', plot_n_projected, data),
+             ('plot_k_is_n', plot_k_is_n, data[data['n'] == data['k']]),
+             ('plot_n_is_5000', plot_n_is_5000, data[data['n'] == 5000])]
+
+    # how much slower Chan's algorithm is than the other O(n log h) algorithm, where both were timed, and how much
+    # slower the randomized incremental 3D hull is than Qhull
+    for numerator, denominator, name, df in [('Chan\'s Algorithm', 'Kirkpatrick-Seidel', 'chan', data),
+                                             ('Chan\'s Algorithm (NumPy)', 'Kirkpatrick-Seidel (NumPy)', 'chan_array',
+                                              data),
+                                             ('Randomized Incremental (3D)', 'Qhull (3D)', 'incremental_3d', data_3d)]:
+        if {numerator, denominator} <= set(df['algorithm']):
+            plot = partial(plot_ratio, numerator=numerator, denominator=denominator, name=name)
+            plots.append((f'plot_ratio_{name}', plot, df[df['algorithm'].isin([numerator, denominator])]))
 
+    for name, plot, df in plots:
+        key = fingerprint(df)
+        if state['plots'].get(name) == key and os.path.exists(f'data/{name}.png'): continue
+        plot(df)
+        state['plots'][name] = key
+        write_state(state, store)
 
-def main():
-    data = pd.read_csv('data/data_2024-01-21_15:42:18.csv')
-    data = data.drop(columns=['seed', 'correct'])
-    data = data.replace({'graham_scan': 'Graham Scan', 'gift_wrapping': 'Jarvis March', 'chan': 'Chan\'s Algorithm'})
-    plot_3d(data)
-    plot_n_projected(data)
-    plot_k_is_n(data)
-    plot_n_is_5000(data)
 
 if __name__ == '__main__':
-    main()
+    main(*sys.argv[1:])
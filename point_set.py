@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class PointSet:
+    """
+    A set of 2D points stored as a structure of arrays: one (2, n) float64 buffer with all x coordinates in its first
+    row and all y coordinates in its second, so x and y are both contiguous. np.asarray(point_set) is an (n, 2) view
+    of the same buffer, which is why the *_array algorithms take a PointSet as it is, and graham_scan, gift_wrapping,
+    chan, quickhull and kirkpatrick_seidel hand it to their *_array version instead of working on tuples. For a
+    PointSet these and dynamic_hull return the indices of the hull vertices (in clockwise order, starting with the
+    left-most point), coordinates can be looked up with take or tuples.
+    """
+    __slots__ = ('_coordinates',)
+
+    def __init__(self, x, y=None):
+        # from an (n, 2) array or a list of (x, y) tuples, or from separate arrays of x and y coordinates
+        if y is None:
+            self._coordinates = np.ascontiguousarray(np.asarray(x, dtype=float).reshape(-1, 2).T)
+        else:
+            self._coordinates = np.stack((np.asarray(x, dtype=float), np.asarray(y, dtype=float)))
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._coordinates[0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._coordinates[1]
+
+    @property
+    def nbytes(self) -> int:
+        return self._coordinates.nbytes
+
+    def __len__(self):
+        return self._coordinates.shape[1]
+
+    def __array__(self, dtype=None, copy=None):
+        if copy: return np.array(self._coordinates.T, dtype=dtype)
+        return np.asarray(self._coordinates.T, dtype=dtype)
+
+    def __getitem__(self, i) -> tuple:
+        return float(self._coordinates[0, i]), float(self._coordinates[1, i])
+
+    def __iter__(self):
+        return zip(self._coordinates[0].tolist(), self._coordinates[1].tolist())
+
+    def __repr__(self):
+        return f"PointSet({len(self)} points)"
+
+    def take(self, indices) -> np.ndarray:
+        """
+        Returns the coordinates of the points at indices (e.g. a hull) as an (h, 2) array.
+        """
+        return self._coordinates[:, indices].T
+
+    def tuples(self, indices=None) -> list[tuple]:
+        """
+        Returns the points at indices, or all points, as a list of (x, y) tuples.
+        """
+        if indices is None: return list(self)
+        return list(zip(self._coordinates[0, indices].tolist(), self._coordinates[1, indices].tolist()))
+
+
+def main():
+    import tracemalloc
+    from chans_algorithm import chan
+    from graham_scan import graham_scan
+    from gift_wrapping import gift_wrapping
+    from random_convex_hull import random_hull_points
+    # the class the algorithms check for, when this file is run as a script it is not the one defined above
+    from point_set import PointSet
+
+    # peak memory of the conversion the harnesses do plus the algorithm, on lists of tuples and on a PointSet (times
+    # are left out, tracing every allocation slows the algorithms on tuples down a lot)
+    points, vertices = random_hull_points(20, 50_000 - 20, rng=np.random.default_rng(0))
+    conversions = [('tuples', lambda: [tuple(x) for x in points.tolist()]), ('PointSet', lambda: PointSet(points))]
+    for algorithm in [graham_scan, gift_wrapping, chan]:
+        for name, convert in conversions:
+            tracemalloc.start()
+            hull = algorithm(convert())
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            correct = np.array_equal(hull, vertices) if name == 'PointSet' else len(hull) == len(vertices)
+            print(f"{algorithm.__name__} on {name}: peak {peak / 2**20:.1f} MiB ({peak / len(points):.0f} bytes "
+                  f"per point), correct: {correct}")
+
+
+if __name__ == '__main__':
+    main()
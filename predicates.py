@@ -0,0 +1,165 @@
+import numpy as np
+from fractions import Fraction
+
+
+# Relative error bound of the floating point orientation test (Shewchuk, "Adaptive Precision Floating-Point
+# Arithmetic and Fast Robust Geometric Predicates"): the determinant, computed with floats, differs from the exact
+# one by at most this times the sum of the absolute values of its two products.
+EPSILON = 2.0 ** -53
+ERRBOUND = (3 + 16 * EPSILON) * EPSILON
+
+
+def _exact_cross(ax, ay, bx, by, cx, cy, dx, dy) -> Fraction:
+    # floats are integers divided by a power of two, so after scaling by the largest denominator this is integer
+    # arithmetic, which is exact (and a lot faster than doing all of it with fractions)
+    ratios = [float(c).as_integer_ratio() for c in (ax, ay, bx, by, cx, cy, dx, dy)]
+    scale = max(d for _, d in ratios)
+    ax, ay, bx, by, cx, cy, dx, dy = (n * (scale // d) for n, d in ratios)
+    return Fraction((bx - ax) * (dy - cy) - (by - ay) * (dx - cx), scale * scale)
+
+
+def _sign(x) -> int:
+    return int(x > 0) - int(x < 0)
+
+
+def left_of(a: tuple, b: tuple, c: tuple) -> int:
+    """
+    Returns 1 if point c is left of the line from a to b, 0 if c is on the line and -1 if right of the line.
+    The floating point result is used if its error bound shows that its sign is correct, otherwise the
+    determinant is computed exactly.
+    """
+    detleft = (b[0] - a[0]) * (c[1] - a[1])
+    detright = (b[1] - a[1]) * (c[0] - a[0])
+    det = detleft - detright
+
+    # the signs of the two products are always correct, so if they differ the sign of det is as well
+    if (detleft > 0 and detright > 0) or (detleft < 0 and detright < 0):
+        bound = ERRBOUND * abs(detleft + detright)
+        if -bound <= det <= bound:
+            if c == b or c == a: return 0
+            return _sign(_exact_cross(a[0], a[1], b[0], b[1], a[0], a[1], c[0], c[1]))
+    return _sign(det)
+
+
+def compare_intersection(a: tuple, b: tuple, c: tuple, d: tuple, point: tuple) -> int:
+    """
+    Compares the intersection of the lines through a and b and through c and d (which must not be parallel) with
+    point in lexicographic order: returns -1 if it comes before point, 0 if it is point and 1 if it comes after it.
+    As in left_of the floating point result is only used if it is far enough from 0 (with a loose error bound).
+    """
+    # the intersection is a + t (b - a) with t = numerator / denominator, its x coordinate minus that of point has
+    # the sign of x times the sign of the denominator
+    (ax, ay), (bx, by), (cx, cy), (dx, dy), (px, py) = a, b, c, d, point
+    abx, aby, cdx, cdy, acx, acy, pax = bx - ax, by - ay, dx - cx, dy - cy, cx - ax, cy - ay, ax - px
+    denominator_permanent = abs(abx * cdy) + abs(aby * cdx)
+    denominator = abx * cdy - aby * cdx
+    numerator = acx * cdy - acy * cdx
+    x = pax * denominator + numerator * abx
+    x_bound = 16 * EPSILON * (abs(pax) * denominator_permanent + (abs(acx * cdy) + abs(acy * cdx)) * abs(abx))
+    if abs(denominator) > 8 * EPSILON * denominator_permanent and abs(x) > x_bound: return _sign(x * denominator)
+
+    ratios = [float(v).as_integer_ratio() for v in (*a, *b, *c, *d, *point)]
+    scale = max(q for _, q in ratios)
+    ax, ay, bx, by, cx, cy, dx, dy, px, py = (n * (scale // q) for n, q in ratios)
+    denominator = (bx - ax) * (dy - cy) - (by - ay) * (dx - cx)
+    numerator = (cx - ax) * (dy - cy) - (cy - ay) * (dx - cx)
+    x = ((ax - px) * denominator + numerator * (bx - ax)) * denominator
+    if x: return _sign(x)
+    return _sign(((ay - py) * denominator + numerator * (by - ay)) * denominator)
+
+
+def cross_sign(ax, ay, bx, by, cx, cy, dx, dy) -> np.ndarray:
+    """
+    Vectorized sign of the cross product of b - a and d - c, on arrays of coordinates that are broadcast against
+    each other: 1 where d - c points to the left of b - a, 0 where they are parallel and -1 where it points to the
+    right. Only the elements for which the floating point sign can not be trusted are computed exactly.
+    """
+    detleft = (bx - ax) * (dy - cy)
+    detright = (by - ay) * (dx - cx)
+    det = detleft - detright
+    sign = np.sign(det).astype(np.int8)
+
+    uncertain = (detleft * detright > 0) & (np.abs(det) <= ERRBOUND * np.abs(detleft + detright))
+    if uncertain.any():
+        # the same vector twice (as in orientation when c is b) is parallel
+        uncertain &= ~((ax == cx) & (ay == cy) & (bx == dx) & (by == dy))
+        shape = sign.shape
+        sign = sign.reshape(-1)
+        coordinates = [np.broadcast_to(c, shape).reshape(-1) for c in (ax, ay, bx, by, cx, cy, dx, dy)]
+        for i in np.flatnonzero(uncertain):
+            sign[i] = _sign(_exact_cross(*(c[i] for c in coordinates)))
+        sign = sign.reshape(shape)
+    return sign
+
+
+def orientation(ax, ay, bx, by, cx, cy) -> np.ndarray:
+    """
+    Vectorized left_of on arrays of coordinates (broadcast against each other): 1 where c is left of the line from
+    a to b, 0 where it is on the line and -1 where it is right of it.
+    """
+    return cross_sign(ax, ay, bx, by, ax, ay, cx, cy)
+
+
+def farthest_left(ax: float, ay: float, bx: float, by: float, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    Returns a boolean mask of the points (x, y) that lie farthest to the left of the line from a to b, all of them if
+    there are several. Only the points whose distance is too close to the largest one to tell with floats are
+    compared exactly.
+    """
+    detleft = (bx - ax) * (y - ay)
+    detright = (by - ay) * (x - ax)
+    det = detleft - detright
+    near = np.flatnonzero(det >= det.max() - 2 * ERRBOUND * np.max(np.abs(detleft) + np.abs(detright)))
+
+    farthest = np.zeros(len(det), dtype=bool)
+    if len(near) == 1:
+        farthest[near] = True
+        return farthest
+    exact = [_exact_cross(ax, ay, bx, by, ax, ay, x[i], y[i]) for i in near]
+    best = max(exact)
+    farthest[[i for i, e in zip(near, exact) if e == best]] = True
+    return farthest
+
+
+# the same for the 3D orientation test, relative to the permanent of the determinant
+ERRBOUND_3D = (7 + 56 * EPSILON) * EPSILON
+
+
+def _exact_det_3d(a, b, c, d) -> int:
+    # sign of the 3x3 determinant of a - d, b - d, c - d, in integer arithmetic like _exact_cross
+    ratios = [float(x).as_integer_ratio() for x in (*a, *b, *c, *d)]
+    scale = max(q for _, q in ratios)
+    ax, ay, az, bx, by, bz, cx, cy, cz, dx, dy, dz = (p * (scale // q) for p, q in ratios)
+    ax, ay, az, bx, by, bz, cx, cy, cz = ax - dx, ay - dy, az - dz, bx - dx, by - dy, bz - dz, cx - dx, cy - dy, cz - dz
+    return _sign(az * (bx * cy - cx * by) + bz * (cx * ay - ax * cy) + cz * (ax * by - bx * ay))
+
+
+def orientation_3d(a, b, c, d) -> np.ndarray:
+    """
+    Vectorized 3D orientation test on arrays of points (shape (..., 3), broadcast against each other): 1 where d lies
+    above the plane through a, b and c, i.e. on the side from which a, b, c are seen in counterclockwise order, 0
+    where it lies in the plane and -1 where it lies below it. Uncertain elements are computed exactly, as in
+    orientation.
+    """
+    a, b, c, d = (np.asarray(p, dtype=float) for p in (a, b, c, d))
+    ad, bd, cd = a - d, b - d, c - d
+    adx, ady, adz = ad[..., 0], ad[..., 1], ad[..., 2]
+    bdx, bdy, bdz = bd[..., 0], bd[..., 1], bd[..., 2]
+    cdx, cdy, cdz = cd[..., 0], cd[..., 1], cd[..., 2]
+
+    bc, ca, ab = bdx * cdy - cdx * bdy, cdx * ady - adx * cdy, adx * bdy - bdx * ady
+    det = adz * bc + bdz * ca + cdz * ab
+    permanent = (np.abs(bdx * cdy) + np.abs(cdx * bdy)) * np.abs(adz) \
+        + (np.abs(cdx * ady) + np.abs(adx * cdy)) * np.abs(bdz) \
+        + (np.abs(adx * bdy) + np.abs(bdx * ady)) * np.abs(cdz)
+    # det is negative when d lies above the plane
+    sign = np.array(-np.sign(det), dtype=np.int8)
+
+    uncertain = np.abs(det) <= ERRBOUND_3D * permanent
+    if uncertain.any():
+        # with d equal to one of the other points the determinant is exactly 0
+        uncertain &= ~(np.all(ad == 0, axis=-1) | np.all(bd == 0, axis=-1) | np.all(cd == 0, axis=-1))
+        a, b, c, d = np.broadcast_arrays(a, b, c, d)
+        for i in map(tuple, np.argwhere(uncertain)):
+            sign[i] = -_exact_det_3d(a[i], b[i], c[i], d[i])
+    return sign
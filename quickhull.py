@@ -0,0 +1,90 @@
+import numpy as np
+from time import perf_counter
+
+from graham_scan import lexsort_unique
+from predicates import orientation, farthest_left
+from point_set import PointSet
+import instrumentation
+
+
+def quickhull_array(points: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Quickhull on an (n, 2) array of points. The line from the left-most to the right-most point splits the points
+    in an upper and a lower part. For every hull edge p -> q that is not final yet, the point farthest to the left
+    of it is a hull vertex f, and only the points to the left of p -> f and of f -> q have to be looked at further,
+    everything else is pruned. The points of a part are kept as an array of indices that is split with boolean
+    masks, the parts still to be done are kept on a stack instead of recursing.
+    Returns the indices into points of the hull vertices in clockwise order, starting with the left-most point,
+    and their coordinates.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0: return np.empty(0, dtype=np.intp), np.empty((0, 2))
+    x, y = points[:, 0], points[:, 1]
+
+    stats = instrumentation.stats
+    if stats is not None: t = perf_counter()
+    candidates = lexsort_unique(x, y)
+    if stats is not None: t = stats.lap('quickhull sort', t)
+    if len(candidates) <= 2: return candidates, points[candidates]
+    a, b = candidates[0], candidates[-1] # left-most and right-most point
+
+    def left_of(p, q, s):
+        # 1 for the points s strictly left of the line from p to q, 0 on it and -1 right of it
+        if stats is not None: stats.orientation_tests += len(s)
+        return orientation(x[p], y[p], x[q], y[q], x[s], y[s])
+
+    side = left_of(a, b, candidates)
+    hull = []
+    # a stack of vertices (int) and edges (p, q, points left of p -> q), popped in clockwise order
+    stack = [(b, a, candidates[side < 0]), b, (a, b, candidates[side > 0])]
+    hull.append(a)
+    while stack:
+        item = stack.pop()
+        if not isinstance(item, tuple):
+            hull.append(item)
+            continue
+        p, q, s = item
+        if len(s) == 0: continue
+        if stats is not None:
+            stats.subproblems += 1
+            stats.orientation_tests += len(s) # by farthest_left
+
+        # farthest point from the edge, of several take the one closest to p as the others are not vertices. They
+        # lie on a line parallel to the edge, so the closest one is the first in lexicographic order if the edge
+        # points in increasing lexicographic order and the last one otherwise
+        farthest = s[farthest_left(x[p], y[p], x[q], y[q], x[s], y[s])]
+        key = x[farthest] + 1j * y[farthest]
+        f = farthest[np.argmin(key) if x[q] + 1j * y[q] > x[p] + 1j * y[p] else np.argmax(key)]
+
+        stack.append((f, q, s[left_of(f, q, s) > 0]))
+        stack.append(f)
+        stack.append((p, f, s[left_of(p, f, s) > 0]))
+
+    if stats is not None: stats.lap('quickhull partition', t)
+    hull = np.array(hull)
+    return hull, points[hull]
+
+
+def quickhull(points: list[tuple]) -> list[tuple]:
+    """
+    Find the convex hull of a set of points using Quickhull, see quickhull_array.
+    For a PointSet the indices of the hull vertices are returned.
+    """
+    if isinstance(points, PointSet): return quickhull_array(points)[0]
+    if len(points) == 0: return []
+    _, hull = quickhull_array(np.array(points, dtype=float))
+    return [tuple(p) for p in hull.tolist()]
+
+
+def main():
+    from show_hull import show_hull
+    from random_convex_hull import random_convex_hull_with_points
+
+    n, m = 10, 100
+    points = random_convex_hull_with_points(n, m).points
+    _, hull = quickhull_array(points)
+    show_hull(points, hull)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.spatial import ConvexHull, Delaunay
 
 
@@ -7,6 +6,14 @@ def random_convex_hull(n: int, rng=None) -> ConvexHull:
     """
     Generate random convex hull with n points on the hull.
     """
+    return ConvexHull(random_convex_polygon(n, rng=rng))
+
+
+def random_convex_polygon(n: int, rng=None) -> np.ndarray:
+    """
+    Generate the vertices of a random convex polygon with n vertices, in
+    counterclockwise order.
+    """
     assert n >= 3, 'n must be greater than or equal to 3'
     rng = np.random.default_rng() if rng is None else rng
 
@@ -38,9 +45,7 @@ def random_convex_hull(n: int, rng=None) -> ConvexHull:
     # Center the vertices on [0.5, 0.5]. This is not strictly necessary but
     # ensures that no points are outside the unit square.
     xy -= (xy.max(axis=0) + xy.min(axis=0) - 1) / 2
-
-    # Return the convex hull.
-    return ConvexHull(xy)
+    return xy
 
 
 def random_points_in_delaunay(tri: Delaunay, n: int, rng=None) -> np.ndarray:
@@ -54,11 +59,16 @@ def random_points_in_delaunay(tri: Delaunay, n: int, rng=None) -> np.ndarray:
     # randomly select a triangle weighted by the area.
     tri_idx = rng.choice(len(area), size=n, p=area/area.sum())
 
-    # Generate random points in the selected triangles using Kraemer's method.
     a = tri.points[tri.simplices[tri_idx, 0]]
     b = tri.points[tri.simplices[tri_idx, 1]]
     c = tri.points[tri.simplices[tri_idx, 2]]
-    x, y = rng.random((2, n))
+    return random_points_in_triangles(a, b, c, rng)
+
+
+def random_points_in_triangles(a: np.ndarray, b: np.ndarray, c: np.ndarray, rng) -> np.ndarray:
+    """Generate a random point in every triangle (a[i], b[i], c[i])."""
+    # Generate random points in the triangles using Kraemer's method.
+    x, y = rng.random((2, len(a)))
     q = np.abs(x - y)
     s, t, u = q, (x + y - q) / 2, 1 - (x + y + q) / 2
     return a * s[:, None] + b * t[:, None] + c * u[:, None]
@@ -89,7 +99,101 @@ def random_convex_hull_with_points(n: int, m: int, rng=None) -> ConvexHull:
     return ConvexHull(rng.permutation(np.concatenate((hull.points, points))))
 
 
+def random_convex_hull_3d_with_points(n: int, m: int, rng=None) -> ConvexHull:
+    """
+    Generate a random 3D convex hull with n points on the hull, on the unit
+    sphere, and m points inside the hull.
+    """
+    assert n >= 4, 'n must be greater than or equal to 4'
+    assert m >= 0, 'm must be greater than or equal to 0'
+    rng = np.random.default_rng() if rng is None else rng
+    vertices = rng.normal(size=(n, 3))
+    vertices /= np.linalg.norm(vertices, axis=1)[:, None]
+    points = random_points_in_polyhedron(ConvexHull(vertices), m, rng)
+    return ConvexHull(rng.permutation(np.concatenate((vertices, points))))
+
+
+def random_points_in_polyhedron(hull: ConvexHull, m: int, rng) -> np.ndarray:
+    """
+    Generate m random points in a convex polyhedron, using the tetrahedra from
+    its centroid to its (triangular) faces.
+    """
+    corners = hull.points[hull.simplices]
+    center = hull.points[hull.vertices].mean(axis=0)
+    volume = np.abs(np.einsum('ij,ij->i', corners[:, 0] - center,
+                              np.cross(corners[:, 1] - center, corners[:, 2] - center)))
+
+    # the number of points in every tetrahedron, and uniform barycentric coordinates in it
+    tet_idx = rng.permutation(np.repeat(np.arange(len(volume)), rng.multinomial(m, volume / volume.sum())))
+    weights = rng.dirichlet(np.ones(4), size=m)
+    return weights[:, :1] * center + np.einsum('ij,ijk->ik', weights[:, 1:], corners[tet_idx])
+
+
+def random_points_in_polygon(polygon: np.ndarray, m: int, rng) -> np.ndarray:
+    """
+    Generate m random points in a convex polygon, using the fan triangulation
+    from its first vertex instead of a Delaunay triangulation.
+    """
+    a, b, c = polygon[0], polygon[1:-1], polygon[2:]
+    area = np.abs(tri_area_2d(np.stack((np.broadcast_to(a, b.shape), b, c), axis=1)))
+
+    # the number of points in every triangle, in random order
+    tri_idx = rng.permutation(np.repeat(np.arange(len(area)), rng.multinomial(m, area / area.sum())))
+    return random_points_in_triangles(np.broadcast_to(a, (m, 2)), b[tri_idx], c[tri_idx], rng)
+
+
+def clockwise_from_left(polygon: np.ndarray) -> np.ndarray:
+    """
+    Positions of the vertices of a counterclockwise polygon in clockwise order,
+    starting with the left-most (and then lowest) vertex.
+    """
+    order = np.arange(len(polygon))[::-1]
+    start = np.lexsort((polygon[order, 1], polygon[order, 0]))[0]
+    return np.roll(order, -start)
+
+
+def random_hull_points(n: int, m: int, rng=None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Generate a random convex polygon with n vertices and m points inside it
+    without scipy. Returns the n + m points in random order and the indices of
+    the hull vertices in clockwise order, starting with the left-most point.
+    """
+    vertices, chunks = random_hull_point_chunks(n, m, chunk_size=n + m, rng=rng)
+    return next(chunks), vertices
+
+
+def random_hull_point_chunks(n: int, m: int, chunk_size: int = 1_000_000, rng=None):
+    """
+    Like random_hull_points, but for point sets that do not fit in memory:
+    returns the indices of the hull vertices and an iterator over chunks of at
+    most chunk_size points. Only one chunk is in memory at a time, the hull
+    vertices are spread over random positions in the whole stream.
+    """
+    assert m >= 0, 'm must be greater than or equal to 0'
+    rng = np.random.default_rng() if rng is None else rng
+    polygon = random_convex_polygon(n, rng=rng)
+    vertices = np.sort(rng.choice(n + m, size=n, replace=False))
+    vertex_order = rng.permutation(n) # vertex_order[i] is the polygon vertex at vertices[i]
+
+    def chunks():
+        for start in range(0, n + m, chunk_size):
+            stop = min(start + chunk_size, n + m)
+            lo, hi = np.searchsorted(vertices, [start, stop])
+            chunk = np.empty((stop - start, 2))
+            is_vertex = np.zeros(stop - start, dtype=bool)
+            is_vertex[vertices[lo:hi] - start] = True
+            chunk[is_vertex] = polygon[vertex_order[lo:hi]]
+            chunk[~is_vertex] = random_points_in_polygon(polygon, (~is_vertex).sum(), rng)
+            yield chunk
+
+    position = np.empty(n, dtype=np.intp)
+    position[vertex_order] = vertices
+    return position[clockwise_from_left(polygon)], chunks()
+
+
 def main():
+    import matplotlib.pyplot as plt
+
     n, m = 3, 90
     hull = random_convex_hull_with_points(n, m)
     mask = np.ones(len(hull.points), dtype=bool)
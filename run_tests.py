@@ -2,6 +2,10 @@ from random_convex_hull import *
 from graham_scan import graham_scan
 from gift_wrapping import gift_wrapping
 from chans_algorithm import chan
+from quickhull import quickhull
+from kirkpatrick_seidel import kirkpatrick_seidel
+from convex_hull_3d import incremental_hull_3d
+from instrumentation import instrument, HullStats
 
 from scipy.spatial import ConvexHull
 from itertools import groupby
@@ -13,6 +17,8 @@ import csv
 import datetime
 import time
 import sys
+import os
+from multiprocessing import Pool
 
 
 def test_method(correct_hull: ConvexHull, method=graham_scan):
@@ -26,28 +32,140 @@ def test_method(correct_hull: ConvexHull, method=graham_scan):
 
 
 
-def main():
-    # Create a new file with current date and time in the name:
-    now = datetime.datetime.now()
-    filename = f'data/data_{now.strftime("%Y-%m-%d_%H:%M:%S")}.csv'
+def qhull_3d(points: list[tuple]) -> list[tuple]:
+    # scipy's Qhull as the reference for the 3D algorithms
+    points = np.array(points, dtype=float)
+    return [tuple(p) for p in points[ConvexHull(points).vertices].tolist()]
 
+
+METHODS = {method.__name__: method for method in [gift_wrapping, graham_scan, chan, quickhull, kirkpatrick_seidel]}
+METHODS_3D = {method.__name__: method for method in [incremental_hull_3d, qhull_3d]}
+
+
+def cells():
+    # all (n, k) combinations that are timed
+    for n, _ in groupby(np.geomspace(3, 5000, 20, dtype=int)):
+        for k, _ in groupby(np.geomspace(3, n, 20, dtype=int)):
+            yield int(n), int(k)
+
+
+STATS_COLUMNS = [name for name in HullStats.__slots__ if name not in ('chan_m', 'phase_times')]
+
+
+def run_job(job):
+    """
+    Time one algorithm on all seeds of one (n, k) cell, so a worker only runs a single algorithm at a time.
+    If instrument is set, every point set is solved a second time with the instrumentation on (so the timings are
+    not affected by it) and the counters are returned as well.
+    """
+    n, k, name, seeds, instrumented = job
+    rows, stats_rows = [], []
+    for seed in seeds:
+        rng = np.random.default_rng(seed)
+        if name in METHODS_3D: correct_hull = random_convex_hull_3d_with_points(k, n-k, rng=rng)
+        else: correct_hull = random_convex_hull_with_points(k, n-k, rng=rng)
+        method = METHODS_3D.get(name) or METHODS[name]
+        correct, time = test_method(correct_hull, method)
+        rows.append([n, k, seed, name, correct, time])
+        if instrumented:
+            with instrument() as stats:
+                test_method(correct_hull, method)
+            phases = ' '.join(f'{phase}:{t:.9f}' for phase, t in stats.phase_times.items())
+            stats_rows.append([n, k, seed, name] + [getattr(stats, c) for c in STATS_COLUMNS]
+                              + [' '.join(map(str, stats.chan_m)), phases])
+    return rows, stats_rows
+
+
+def read_finished_jobs(filename, repeats):
+    """
+    Reads the rows of a (partial) data file and returns the rows of the jobs, i.e. (n, k, algorithm) combinations,
+    that were finished, together with the seeds used for each (n, k) cell. A row that was still being written when
+    the run was interrupted is left out.
+    """
+    with open(filename) as csvfile:
+        lines = csvfile.readlines()[1:]
+    # a row is only complete with its line end, a cut off number could still be parsed
+    if lines and not lines[-1].endswith('\n'): lines.pop()
+
+    jobs = {}
+    for row in csv.reader(lines):
+        try:
+            n, k, seed, name, correct, time = row
+            row = [int(n), int(k), int(seed), name, correct == 'True', int(time)]
+        except ValueError:
+            continue
+        jobs.setdefault((row[0], row[1], name), []).append(row)
+
+    finished = {job: rows for job, rows in jobs.items() if len(rows) == repeats}
+    seeds = {(n, k): [row[2] for row in rows] for (n, k, _), rows in finished.items()}
+    return finished, seeds
+
+
+def main(filename=None, processes=None, repeats=250, instrumented=False):
+    """
+    Times all methods on every (n, k) cell with a pool of processes. Every finished job is written to the data file
+    right away, so an interrupted run can be resumed by passing its data file. Apart from the csv file, the data is
+    also saved column by column to a .npz file with the same name.
+    With instrumented set, the counters of the instrumentation module are written to a second file next to the data
+    file, ending in _stats.csv, with one row per point set.
+    """
+    finished, seeds = {}, {}
+    if filename is None:
+        # Create a new file with current date and time in the name:
+        now = datetime.datetime.now()
+        filename = f'data/data_{now.strftime("%Y-%m-%d_%H:%M:%S")}.csv'
+    elif os.path.exists(filename):
+        finished, seeds = read_finished_jobs(filename, repeats)
+
+    seed_gen = np.random.default_rng()
+    jobs = []
+    for name in [*METHODS, *METHODS_3D]:
+        for n, k in cells():
+            if (n, k, name) in finished: continue
+            # a 3D hull has at least 4 vertices
+            if name in METHODS_3D and k < 4: continue
+            if (n, k) not in seeds: seeds[(n, k)] = [int(seed_gen.bit_generator.random_raw()) for _ in range(repeats)]
+            jobs.append((n, k, name, seeds[(n, k)], instrumented))
+
+    # rewrite the file with only the finished jobs, dropping the rows of a job that was interrupted
     with open(filename, 'w') as csvfile:
         writer = csv.writer(csvfile, delimiter=',')
         writer.writerow(['n', 'k', 'seed', 'algorithm', 'correct', 'dt'])
+        for rows in finished.values():
+            writer.writerows(rows)
+
+        stats_file = stats_writer = None
+        if instrumented:
+            stats_filename = os.path.splitext(filename)[0] + '_stats.csv'
+            new = not os.path.exists(stats_filename)
+            stats_file = open(stats_filename, 'a')
+            stats_writer = csv.writer(stats_file, delimiter=',')
+            if new: stats_writer.writerow(['n', 'k', 'seed', 'algorithm'] + STATS_COLUMNS + ['chan_m', 'phase_times'])
+
+        try:
+            with Pool(processes) as pool:
+                for rows, stats_rows in tqdm(pool.imap_unordered(run_job, jobs), total=len(jobs)):
+                    writer.writerows(rows)
+                    csvfile.flush()
+                    if stats_writer:
+                        stats_writer.writerows(stats_rows)
+                        stats_file.flush()
+        finally:
+            if stats_file: stats_file.close()
+
+    save_columns(filename)
+
 
-        seed_gen = np.random.default_rng()
+def save_columns(filename):
+    # store the data of a csv file as one array per column next to it
+    with open(filename) as csvfile:
+        n, k, seed, name, correct, time = zip(*list(csv.reader(csvfile))[1:]) or [()] * 6
+    np.savez(os.path.splitext(filename)[0] + '.npz', n=np.array(n, dtype=int), k=np.array(k, dtype=int),
+             seed=np.array([int(x) for x in seed], dtype=np.uint64), algorithm=np.array(name, dtype=str),
+             correct=np.array(correct) == 'True', dt=np.array(time, dtype=np.int64))
 
-        for n, _ in groupby(np.geomspace(3, 5000, 20, dtype=int)):
-            for k, _ in groupby(np.geomspace(3, n, 20, dtype=int)):
-                for _ in range(250):
-                    seed = seed_gen.bit_generator.random_raw()
-                    rng = np.random.default_rng(seed)
-                    correct_hull = random_convex_hull_with_points(k, n-k, rng=rng)
-                    for method in [gift_wrapping, graham_scan, chan]:
-                        name = method.__name__
-                        print(f'n={n}, k={k}, seed={seed}, method={name}')
-                        correct, time = test_method(correct_hull, method)
-                        writer.writerow([n, k, seed, name, correct, time])
 
 if __name__ == '__main__':
-    main()
+    # pass the data file of an interrupted run to resume it, and --stats to also collect the instrumentation counters
+    args = [arg for arg in sys.argv[1:] if arg != '--stats']
+    main(args[0] if args else None, instrumented='--stats' in sys.argv[1:])
@@ -0,0 +1,129 @@
+import heapq
+import random
+
+from predicates import left_of
+from convex_chain import Chain, split, merge, chain_points, below
+
+
+def _add(chain, point, side):
+    # the upper (side = 1) or lower (side = -1) hull of the chain and one more point, the chain itself is not changed.
+    # Most points of a stream fall below the chain, which only takes a search.
+    if chain is not None and below(point, chain, side): return chain
+    left, right = split(chain, point, True)
+    return merge(merge(left, Chain(point, random.random()), side), right, side)
+
+
+def _convex_chain(points, side):
+    # monotone chain over lexicographically sorted points, keeping the upper (side = 1) or lower (side = -1) hull
+    chain = []
+    for p in points:
+        if chain and chain[-1] == p: continue
+        while len(chain) >= 2 and side * left_of(chain[-2], chain[-1], p) >= 0:
+            chain.pop()
+        chain.append(p)
+    return chain
+
+
+class SlidingWindowHull:
+    """
+    Convex hull of the last size points of a stream, as a queue built from two stacks. New points are pushed on the
+    back stack, old points expire from the front stack and when the front is empty the back is moved over. Hulls
+    are stored as upper and lower chains in the persistent treaps of convex_chain, so they can be shared:
+        - the back only keeps the hull of all its points, a new point is added to it with a split and two merges
+          (O(log h) for a hull of h vertices)
+        - every entry of the front keeps the hull of its point and all newer points in the front, each made from the
+          one before it by adding a single point, so moving the back over costs the same per point
+    Both push and expire take O(log h) amortized time, independent of the window size. The hull of the window is
+    the hull of the front and back hulls, found in O(h) time by hull(), and only if one of them changed.
+    """
+
+    def __init__(self, size, points=()):
+        if size < 1: raise ValueError('the window must hold at least one point')
+        self.size = size
+        # entries (point, upper, lower), the oldest point last
+        self._front = []
+        self._back = []
+        self._back_upper = self._back_lower = None
+        # the last result of hull() and the chains it was made from
+        self._hull, self._chains = [], ()
+        for point in points:
+            self.push(point)
+
+    def __len__(self):
+        return len(self._front) + len(self._back)
+
+    def push(self, point):
+        """
+        Adds a point to the window, the oldest point expires if the window is full.
+        """
+        point = tuple(point)
+        self._back.append(point)
+        self._back_upper = _add(self._back_upper, point, 1)
+        self._back_lower = _add(self._back_lower, point, -1)
+        if len(self) > self.size: self.expire()
+
+    def expire(self) -> tuple:
+        """
+        Removes the oldest point from the window and returns it.
+        """
+        if not self._front:
+            if not self._back: raise IndexError('expire from an empty window')
+            upper = lower = None
+            for point in reversed(self._back):
+                upper, lower = _add(upper, point, 1), _add(lower, point, -1)
+                self._front.append((point, upper, lower))
+            self._back = []
+            self._back_upper = self._back_lower = None
+        return self._front.pop()[0]
+
+    def hull(self) -> list[tuple]:
+        """
+        Returns the vertices of the convex hull of the window in clockwise order, starting with the left-most point.
+        """
+        if not len(self): return []
+        uppers, lowers = [self._back_upper], [self._back_lower]
+        if self._front:
+            uppers.append(self._front[-1][1])
+            lowers.append(self._front[-1][2])
+
+        # chains are never modified, so the hull is the same as long as the chains are (true for most points)
+        chains = (*uppers, *lowers)
+        if len(chains) != len(self._chains) or any(a is not b for a, b in zip(chains, self._chains)):
+            upper = _convex_chain(heapq.merge(*map(chain_points, uppers)), 1)
+            lower = _convex_chain(heapq.merge(*map(chain_points, lowers)), -1)
+            self._hull, self._chains = upper + lower[-2:0:-1], chains
+        return list(self._hull)
+
+
+def main():
+    import numpy as np
+    from time import perf_counter_ns
+    from benchmark import measure, summarize
+    from graham_scan import graham_scan
+
+    # correctness on a small window of grid points, with many repeated and collinear points
+    rng = random.Random(0)
+    stream = [(rng.randint(0, 10), rng.randint(0, 10)) for _ in range(2000)]
+    window = SlidingWindowHull(50)
+    for i, point in enumerate(stream):
+        window.push(point)
+        hull = window.hull()
+        if len(hull) != len(set(hull)) or set(hull) != set(graham_scan(stream[max(0, i - 49):i + 1])):
+            print(f"Hull differs after {i + 1} points")
+
+    # time per event (push, expire and hull) against a Graham scan of the whole window
+    for size in [10**3, 10**4, 10**5, 10**6]:
+        points = [tuple(p) for p in np.random.default_rng(size).normal(size=(2 * size, 2)).tolist()]
+        window = SlidingWindowHull(size, points[:size])
+        t0 = perf_counter_ns()
+        for point in points[size:]:
+            window.push(point)
+            window.hull()
+        t1 = perf_counter_ns()
+        recompute = summarize(measure(graham_scan, lambda: points[size:], repeat=3, warmup=0, min_time=0))
+        print(f"window of {size} points: sliding window {(t1 - t0) / size / 1000:.1f} us per point, "
+              f"Graham scan of the window {recompute['median'] / 1000:.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import numpy as np
+
+from graham_scan import graham_scan_array, monotone_chain
+
+
+def lexicographic_runs(hull: np.ndarray) -> np.ndarray:
+    """
+    A convex polygon in clockwise order that starts with its left-most point consists of two lexicographically
+    sorted runs: the upper hull up to the right-most point and the lower hull read backwards. Returns the positions
+    of the vertices in the order of these two runs.
+    """
+    if len(hull) == 0: return np.arange(0)
+    right = np.flatnonzero(hull[:, 0] == hull[:, 0].max())
+    right = right[np.argmax(hull[right, 1])]
+    return np.concatenate((np.arange(right + 1), np.arange(len(hull) - 1, right, -1)))
+
+
+def merge_hulls(indices_a: np.ndarray, hull_a: np.ndarray, indices_b: np.ndarray, hull_b: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the convex hull of two convex polygons in linear time. Both polygons are given by the indices of their
+    vertices and their coordinates, in clockwise order starting with the left-most point (as returned by the *_array
+    algorithms). The four lexicographically sorted runs of vertices are merged with a stable sort, which finds and
+    merges runs in linear time, after which a single Graham scan over the merged vertices gives the hull.
+    """
+    indices = np.concatenate((indices_a[lexicographic_runs(hull_a)], indices_b[lexicographic_runs(hull_b)]))
+    hull = np.concatenate((hull_a[lexicographic_runs(hull_a)], hull_b[lexicographic_runs(hull_b)]))
+    if len(hull) == 0: return indices, hull
+
+    # complex numbers are compared lexicographically
+    order = np.argsort(hull[:, 0] + 1j * hull[:, 1], kind='stable')
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = np.any(hull[order[1:]] != hull[order[:-1]], axis=1)
+    order = order[keep]
+
+    vertices = order[monotone_chain(hull[:, 0], hull[:, 1], order)]
+    return indices[vertices], hull[vertices]
+
+
+def open_points(path: str) -> np.ndarray:
+    """
+    Memory maps a file of points, either a .npy file or raw float64 (x, y) pairs.
+    """
+    if path.endswith('.npy'): return np.load(path, mmap_mode='r')
+    return np.memmap(path, dtype=np.float64, mode='r').reshape(-1, 2)
+
+
+def streaming_hull(points, chunk_size: int = 1_000_000, algorithm=graham_scan_array) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the convex hull of a point set that does not fit in memory. points is either an (n, 2) array, typically
+    an np.memmap (see open_points), that is read chunk_size rows at a time, or an iterable of (k, 2) chunks. The hull
+    of every chunk is computed with algorithm (any of the *_array algorithms) and merged into the running hull, so
+    at most one chunk and two hulls are in memory at the same time.
+    Returns the indices of the hull vertices in the whole stream, in clockwise order starting with the left-most
+    point, and their coordinates.
+    """
+    if hasattr(points, 'shape'):
+        chunks = (points[i:i+chunk_size] for i in range(0, len(points), chunk_size))
+    else:
+        chunks = iter(points)
+
+    indices, hull = np.empty(0, dtype=np.intp), np.empty((0, 2))
+    offset = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype=float)
+        chunk_indices, chunk_hull = algorithm(chunk)
+        indices, hull = merge_hulls(indices, hull, chunk_indices + offset, chunk_hull)
+        offset += len(chunk)
+
+    return indices, hull
+
+
+def main():
+    import os
+    import tempfile
+    from random_convex_hull import random_hull_points, random_hull_point_chunks
+
+    n, m = 50, 2_000_000
+    points, vertices = random_hull_points(n, m)
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'points.npy')
+        np.save(path, points)
+        indices, hull = streaming_hull(open_points(path), chunk_size=100_000)
+    print(f"Found {len(hull)} hull vertices, expected {n}, correct: {np.array_equal(indices, vertices)}")
+
+    # generated on the fly, without ever holding all points in memory
+    vertices, chunks = random_hull_point_chunks(n, 20_000_000)
+    indices, hull = streaming_hull(chunks)
+    print(f"Found {len(hull)} hull vertices of 20 million points, correct: {np.array_equal(indices, vertices)}")
+
+
+if __name__ == '__main__':
+    main()
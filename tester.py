@@ -1,13 +1,27 @@
 import numpy as np
+import os
+import sys
+import subprocess
 try:
     from termcolor import colored
 except:
     print("pip install termcolor for color coded messages!")
 
 from create_hulls import load_hulls
-from chans_algorithm import chan
-from graham_scan import graham_scan
-from gift_wrapping import gift_wrapping
+from chans_algorithm import chan, chan_array
+from graham_scan import graham_scan, graham_scan_array
+from gift_wrapping import gift_wrapping, gift_wrapping_array
+from dynamic_hull import dynamic_hull
+from quickhull import quickhull, quickhull_array
+from hull_index import HullIndex
+from predicates import orientation, orientation_3d
+from convex_hull_3d import incremental_hull_3d_array
+from random_convex_hull import random_convex_hull_3d_with_points
+from kirkpatrick_seidel import kirkpatrick_seidel, kirkpatrick_seidel_array
+from point_set import PointSet
+from akl_toussaint import with_prefilter
+from hull_cache import HullCache
+from batch_hulls import batch_hulls
 
 def verify_hull(true_hull, candidate_hull):
     if len(true_hull) != len(candidate_hull): return False
@@ -16,35 +30,222 @@ def verify_hull(true_hull, candidate_hull):
     except:
         return False
 
-def test_algorithm(algorithm, folder, filter=None):
+def verify_certificate(points, hull) -> tuple[bool, str]:
+    """
+    Checks that hull is the convex hull of points without a reference hull, in O(n log h) time:
+        - the hull is a strictly convex polygon in clockwise order, i.e. every turn is a right turn and, starting
+          from its lexicographically smallest vertex, the vertices first increase and then decrease lexicographically
+          (so it winds around only once)
+        - every point lies inside or on the boundary of the hull
+        - every vertex of the hull is one of the points
+    The hull may start at any vertex. Returns whether the hull is correct and, if not, the first check that failed.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    hull = np.asarray(hull, dtype=float).reshape(-1, 2)
+    h = len(hull)
+    if len(points) == 0 or h == 0: return len(points) == h, 'empty input or empty hull'
+
+    if h >= 3:
+        a, b, c = hull, np.roll(hull, -1, axis=0), np.roll(hull, -2, axis=0)
+        turn = orientation(a[:, 0], a[:, 1], b[:, 0], b[:, 1], c[:, 0], c[:, 1])
+        if np.any(turn >= 0): return False, f'no right turn at vertex {np.flatnonzero(turn >= 0)[0] + 1}'
+
+        # complex numbers are compared lexicographically
+        key = hull[:, 0] + 1j * hull[:, 1]
+        key = np.roll(key, -np.argmin(key))
+        right = np.argmax(key)
+        if np.any(np.diff(key[:right + 1]) <= 0) or np.any(np.diff(np.append(key[right:], key[0])) >= 0):
+            return False, 'not lexicographically bitonic, the polygon winds around more than once'
+    elif h == 2 and np.all(hull[0] == hull[1]):
+        return False, 'repeated vertex'
+
+    if not HullIndex(hull).contains(points).all(): return False, 'not all points are inside the hull'
+
+    # look up every point among the sorted vertices and mark the vertices that are found
+    key = np.sort(hull[:, 0] + 1j * hull[:, 1])
+    point_key = points[:, 0] + 1j * points[:, 1]
+    i = np.minimum(np.searchsorted(key, point_key), h - 1)
+    found = np.zeros(h, dtype=bool)
+    found[i[key[i] == point_key]] = True
+    if not found.all(): return False, 'not all vertices are input points'
+    return True, ''
+
+def verify_certificate_3d(points, faces) -> tuple[bool, str]:
+    """
+    Checks that faces (an (f, 3) array of indices into points, each face counterclockwise as seen from outside) are
+    the boundary of the convex hull of the 3D points:
+        - every edge is shared by exactly two faces, in opposite directions, and V - E + F = 2, so the faces form a
+          closed, consistently oriented surface that is a sphere
+        - no point lies above any face (exact orientation test), which also means the faces point outwards
+    Returns whether the hull is correct and, if not, the first check that failed.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    faces = np.asarray(faces).reshape(-1, 3)
+    if len(faces) < 4: return False, 'fewer than 4 faces'
+
+    edges = np.concatenate([faces[:, [i, (i + 1) % 3]] for i in range(3)])
+    directed = set(map(tuple, edges.tolist()))
+    if len(directed) != len(edges): return False, 'an edge is used twice in the same direction'
+    if any((v, u) not in directed for u, v in directed): return False, 'an edge has only one face'
+    if len(np.unique(faces)) - len(edges) // 2 + len(faces) != 2: return False, 'the faces do not form a sphere'
+
+    # in chunks of points, to keep the (points, faces) arrays small
+    a, b, c = (points[faces[:, i]] for i in range(3))
+    for start in range(0, len(points), max(1, 1_000_000 // len(faces))):
+        p = points[start:start + max(1, 1_000_000 // len(faces)), None]
+        if np.any(orientation_3d(a, b, c, p) > 0): return False, 'a point lies above a face'
+    return True, ''
+
+def report(correct, id, message=''):
+    try:
+        if correct: print(colored(f"Check PASSED for id: {id}", color='green'))
+        else: print(colored(f"Check FAILED for id: {id} {message}", color='red'))
+    except:
+        print(f"Check {'PASSED' if correct else 'FAILED'} for id: {id}" + ('' if correct else f" {message}"))
+
+def test_algorithm(algorithm, folder, filter=None, certificate=False, cache=None):
     # given an algorithm (function from [tuple(x,y)] -> [tuple(x,y)]) and a folder with test cases this function checks if 
     # the algorithm yields the same convex hull vertices as the true_hull for the test case (according to scipy.spatial.ConvexHull)
 
-    hulls = load_hulls(folder)
+    # filter can be a pair (n, m) to only run the test cases of that size, either of them can be None
+    # with certificate=True, the hull is checked with verify_certificate instead, which also checks the order
+    # with a HullCache, the hulls are looked up in the cache first, e.g. to check the same folder in both ways
+    if cache is not None: algorithm = cache(algorithm)
+    for (n, m, id, points, hull) in load_hulls(folder, *(filter or (None, None))):
+        (hull, points) = ([tuple(x) for x in hull.tolist()], [tuple(x) for x in points.tolist()])
+        my_hull = algorithm(points)
+        correct, reason = verify_certificate(points, my_hull) if certificate else (verify_hull(hull, my_hull), '')
+        report(correct, id, f"{reason} || computed hull was: {my_hull}")
+
+def test_point_set(algorithms, folder):
+    # given algorithms on lists of tuples and *_array algorithms, checks that for the points of every test case in a
+    # PointSet they return the indices of the hull vertices (the *_array algorithms with their coordinates), also
+    # when wrapped by with_prefilter or a HullCache (called twice, so the second call is a hit). The hulls are checked
+    # with verify_certificate, one report per algorithm
+    for algorithm in algorithms:
+        cached = HullCache()(algorithm)
+        variants = [('', algorithm), ('with_prefilter ', with_prefilter(algorithm)), ('cached ', cached),
+                    ('cached again ', cached)]
+        for variant, wrapped in variants:
+            failed = []
+            for (n, m, id, points, hull) in load_hulls(folder):
+                result = wrapped(PointSet(points))
+                indices = result[0] if isinstance(result, tuple) else result
+                if not isinstance(indices, np.ndarray) or indices.dtype.kind not in 'iu':
+                    failed.append(f"{id}: no array of indices")
+                    continue
+                correct, reason = verify_certificate(points, points[indices])
+                if correct and isinstance(result, tuple):
+                    correct, reason = np.array_equal(result[1], points[indices]), 'coordinates differ'
+                if not correct: failed.append(f"{id}: {reason}")
+            report(not failed, f"{variant}{algorithm.__name__} on a PointSet", '; '.join(failed))
 
-    for (n,m) in hulls:
-        for id in hulls[(n,m)]:
-            (hull, points) = ([tuple(x) for x in hulls[(n,m)][id]['hull'].tolist()], 
-                              [tuple(x) for x in hulls[(n,m)][id]['points'].tolist()])
-            my_hull = algorithm(points)
-            if verify_hull(hull, my_hull):
-                try:
-                    print(colored(f"Check PASSED for id: {id}", color='green'))
-                except:
-                    print(f"Check PASSED for id: {id}")
-            else:
-                try:
-                    print(colored(f"Check FAILED for id: {id} || computed hull was: {my_hull}", color='red'))
-                except:
-                    print(f"Check FAILED for id: {id} || computed hull was: {my_hull}")
+def degenerate_point_sets():
+    # small 2D point sets as (name, points): no points, fewer than three points, repeated and collinear points
+    yield 'no points', np.empty((0, 2))
+    yield 'one point', np.array([[1.0, 2.0]])
+    yield 'two points', np.array([[1.0, 2.0], [0.0, 5.0]])
+    yield 'one point twice', np.array([[1.0, 2.0], [1.0, 2.0]])
+    yield 'one point repeated', np.full((7, 2), 3.0)
+    t = np.array([3.0, 0.0, 8.0, 1.0, 8.0, 5.0, 0.0, 2.0])[:, None]
+    yield 'collinear points', np.hstack((t, 2 * t - 1))
+    yield 'vertical collinear points', np.hstack((np.ones_like(t), t))
+    yield 'triangle with points on its edges', np.concatenate((t * [1, 0], t * [0, 1], t * [-1, 1] + [8, 0]))
 
+def test_batch_hulls(folder):
+    # computes the hulls of the points of all test cases in folder and of degenerate_point_sets with a single call
+    # of batch_hulls (the degenerate sets before and after the others) and checks that the hull of every set has the
+    # same vertices, in the same order, as graham_scan_array gives for that set alone
+    degenerate = list(degenerate_point_sets())
+    cases = degenerate + [(id, points) for (n, m, id, points, hull) in load_hulls(folder)] + degenerate[::-1]
+    sets = [np.asarray(points, dtype=float).reshape(-1, 2) for _, points in cases]
+    offsets = np.cumsum([0] + [len(points) for points in sets[:-1]])
+    hulls, hull_offsets = batch_hulls(np.concatenate(sets), offsets)
+    for (id, _), points, offset, hull in zip(cases, sets, offsets, np.split(hulls, hull_offsets[1:])):
+        expected = graham_scan_array(points)[0]
+        report(np.array_equal(hull - offset, expected), f"batch_hulls {id}",
+               f"|| computed hull was: {(hull - offset).tolist()}, expected {expected.tolist()}")
+
+def special_points_3d():
+    # degenerate 3D point sets as (name, points): many coplanar and collinear points, and repeated points
+    grid = np.stack(np.meshgrid(*[np.arange(5.0)] * 3), axis=-1).reshape(-1, 3)
+    yield 'cube grid', grid
+    yield 'cube grid with repeated points', np.concatenate((grid, grid[::3]))
+    yield 'cube surface', grid[np.any((grid == 0) | (grid == 4), axis=1)]
+    yield 'cube edges', grid[np.sum((grid == 0) | (grid == 4), axis=1) >= 2]
+    octahedron = np.concatenate((np.eye(3), -np.eye(3)))
+    t = np.linspace(0, 1, 7)[:, None]
+    yield 'octahedron edges', np.concatenate([octahedron[i] + t * (octahedron[j] - octahedron[i])
+                                              for i in range(6) for j in range(6) if i % 3 != j % 3])
+    rng = np.random.default_rng(0)
+    sphere = rng.normal(size=(200, 3))
+    yield 'sphere with points almost on the hull', np.concatenate((sphere, sphere[:100] * (1 - 1e-15)))
+
+def test_algorithm_3d(algorithm, sizes, repeats=3, certificate=False):
+    # given a 3D algorithm (function from an (n, 3) array -> (vertex indices, faces)), checks on random hulls with
+    # n points on the hull and m inside, for (n, m) in sizes, that it finds the same vertices as Qhull. With
+    # certificate=True, the faces are checked with verify_certificate_3d instead, on the random and the special
+    # point sets.
+    cases = [(f"3d_{n}_{m}_{seed}", random_convex_hull_3d_with_points(n, m, rng=np.random.default_rng(seed)))
+             for n, m in sizes for seed in range(repeats)]
+    for id, hull in cases:
+        vertices, faces = algorithm(hull.points)
+        if certificate: correct, reason = verify_certificate_3d(hull.points, faces)
+        else: correct, reason = np.array_equal(np.sort(vertices), np.sort(hull.vertices)), 'different vertices'
+        report(correct, id, reason)
+    if certificate:
+        for name, points in special_points_3d():
+            correct, reason = verify_certificate_3d(points, algorithm(points)[1])
+            report(correct, f"3d {name}", reason)
+
+
+# the algorithms, which should only need numpy to import, and the modules that are only loaded for demos and tests
+CORE_MODULES = ['predicates', 'instrumentation', 'graham_scan', 'gift_wrapping', 'chans_algorithm', 'quickhull',
+                'kirkpatrick_seidel', 'akl_toussaint', 'batch_hulls', 'convex_chain', 'dynamic_hull',
+                'sliding_window_hull', 'hull_index', 'streaming_hull', 'convex_hull_3d', 'hull_cache', 'point_set']
+HEAVY_MODULES = ['matplotlib', 'scipy', 'pandas', 'show_hull', 'random_convex_hull', 'multiprocessing']
+
+def test_import_time(budget=0.1, repeats=5):
+    # imports CORE_MODULES in a fresh interpreter, after numpy, and checks that it takes less than budget seconds
+    # (the best of repeats runs) without loading any of HEAVY_MODULES
+    script = (f"import sys, time, numpy; t = time.perf_counter(); import {', '.join(CORE_MODULES)}; "
+              f"print(time.perf_counter() - t); print(' '.join(sys.modules))")
+    times = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split('\n')
+        times.append(float(output[0]))
+    loaded = sorted({name.split('.')[0] for name in output[1].split()} & set(HEAVY_MODULES))
+    report(min(times) < budget and not loaded, f"import time ({min(times) * 1000:.0f} ms)",
+           f"budget {budget * 1000:.0f} ms, loaded {', '.join(loaded) or 'no heavy modules'}")
 
 
 if __name__ == '__main__':
+    test_import_time()
+
     #run tests on special hulls
     test_algorithm(chan, './special_hulls')
     test_algorithm(gift_wrapping, './special_hulls')
     test_algorithm(graham_scan, './special_hulls')
+    test_algorithm(dynamic_hull, './special_hulls')
+    test_algorithm(quickhull, './special_hulls')
+    test_algorithm(kirkpatrick_seidel, './special_hulls')
+
+    #check the order of the hulls as well, without using the stored hulls
+    test_algorithm(chan, './special_hulls', certificate=True)
+    test_algorithm(graham_scan, './special_hulls', certificate=True)
+
+    #points in a PointSet give the indices of the hull vertices, also through the wrappers
+    test_point_set([chan, gift_wrapping, graham_scan, dynamic_hull, quickhull, kirkpatrick_seidel, chan_array,
+                    gift_wrapping_array, graham_scan_array, quickhull_array, kirkpatrick_seidel_array],
+                   './special_hulls')
+
+    #many point sets with one call of batch_hulls
+    test_batch_hulls('./special_hulls')
+
+    #3D hulls, against Qhull and with the certificate (also on degenerate point sets)
+    test_algorithm_3d(incremental_hull_3d_array, [(4, 0), (4, 100), (50, 1000), (1000, 100)])
+    test_algorithm_3d(incremental_hull_3d_array, [(4, 0), (50, 1000)], certificate=True)
 
     #run tests on randomly generated hulls
     #test_algorithm(chan, './hulls5')
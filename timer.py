@@ -5,29 +5,34 @@ import matplotlib.pyplot as plt
 from chans_algorithm import chan
 from gift_wrapping import gift_wrapping
 from graham_scan import graham_scan
+from quickhull import quickhull
+from kirkpatrick_seidel import kirkpatrick_seidel
 from create_hulls import load_hulls
+from akl_toussaint import with_prefilter
 
-def select_algorithm(alg_name):
-    if alg_name == 'chan': return chan
-    elif alg_name == 'gift_wrapping': return gift_wrapping
-    elif alg_name == 'graham_scan': return graham_scan
+def select_algorithm(alg_name, prefilter=False):
+    # with prefilter=True, points strictly inside the Akl-Toussaint polygon are discarded before running the algorithm
+    if alg_name == 'chan': algorithm = chan
+    elif alg_name == 'gift_wrapping': algorithm = gift_wrapping
+    elif alg_name == 'graham_scan': algorithm = graham_scan
+    elif alg_name == 'quickhull': algorithm = quickhull
+    elif alg_name == 'kirkpatrick_seidel': algorithm = kirkpatrick_seidel
     else: raise RuntimeError(f"Algorithm {alg_name} not recognized")
+    return with_prefilter(algorithm) if prefilter else algorithm
 
-def timer(algorithms, folder):
+def timer(algorithms, folder, prefilter=False, cache=None):
+    # with a HullCache, point sets that were hulled before are looked up instead, so only new ones are timed fully
     result = {alg : {} for alg in algorithms}
 
-    test_hulls = load_hulls(folder)
-
-    for (n,m) in test_hulls:
+    for (n, m, id, points, hull) in load_hulls(folder):
+        points = [tuple(x) for x in points.tolist()]
         for alg in algorithms:
-            algorithm = select_algorithm(alg)
-            result[alg][(n,m)] = [] # store generation times of each hull in a list
-            for id in test_hulls[(n,m)]:
-                points = [tuple(x) for x in test_hulls[(n,m)][id]['points'].tolist()]
-                t_start = perf_counter()
-                algorithm(points)
-                t_end = perf_counter()
-                result[alg][(n,m)].append(t_end - t_start)
+            algorithm = select_algorithm(alg, prefilter)
+            if cache is not None: algorithm = cache(algorithm)
+            t_start = perf_counter()
+            algorithm(list(points))
+            t_end = perf_counter()
+            result[alg].setdefault((n,m), []).append(t_end - t_start) # store generation times of each hull in a list
 
     return result
 